@@ -0,0 +1,124 @@
+"""
+命令行入口（在包的上一级目录运行）：
+    python -m arknight run arknight/scene.json --trials 3
+    python -m arknight run --left '{"阿咬": 5}' --right '{"狗pro": 3}'
+    python -m arknight evaluate arknight/arknights53.csv --limit 100
+    python -m arknight bench arknight/scene.json --repeat 5
+
+只有读数据集的子命令才会导入 pandas，模板从 templates.py 的缓存加载，单场查询的启动很快。
+"""
+import argparse
+import json
+import sys
+import time
+
+from . import simulate, utils
+from .battle_field import Battlefield
+from .utils import VIRTUAL_TIME_STEP, Faction, normalize_army
+
+
+def _positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"必须至少为 1，收到 {value}")
+    return value
+
+
+def _armies(args, parser):
+    if args.scene:
+        with open(args.scene, encoding='utf-8') as f:
+            scene = json.load(f)
+        return normalize_army(scene["left"]), normalize_army(scene["right"])
+    if args.left and args.right:
+        return normalize_army(json.loads(args.left)), normalize_army(json.loads(args.right))
+    parser.error("需要 scene 文件，或者同时给出 --left 和 --right")
+
+
+def _battle(monster_data, left, right, seed, fps, visualize=False):
+    battlefield = Battlefield(monster_data, seed=seed, time_step=fps)
+    if not battlefield.setup_battle(left, right, monster_data):
+        raise SystemExit(f"无法开始对局：{left} vs {right}")
+    winner = battlefield.run_battle(visualize=visualize)
+    rounds = battlefield.round
+    battlefield.release_summons()
+    return winner, rounds
+
+
+def cmd_run(args, parser):
+    left, right = _armies(args, parser)
+    monster_data = simulate.load_monster_data(args.monsters)
+    wins = 0
+    for i in range(args.trials):
+        seed = None if args.seed is None else args.seed + i
+        winner, rounds = _battle(monster_data, left, right, seed, args.fps, args.visualize)
+        wins += winner == Faction.LEFT
+        print(f"第 {i + 1} 局：{winner.name}（{rounds} 帧）")
+    print(f"左边胜率 {wins / args.trials:.1%}")
+
+
+def cmd_evaluate(args, parser):
+    from .reporter import EvaluationReporter
+
+    monster_data = simulate.load_monster_data(args.monsters)
+    battle_data = simulate.process_battle_data(args.csv)
+    if args.limit:
+        battle_data = battle_data[:args.limit]
+    reporter = EvaluationReporter(total=len(battle_data), error_path=args.errors)
+    for scene_config in battle_data:
+        left_win = simulate.predict_left_win(monster_data, scene_config["left"], scene_config["right"],
+                                             outcomes=reporter.outcomes)
+        reporter.record(scene_config, left_win)
+    reporter.close()
+    print(reporter.summary())
+
+
+def cmd_bench(args, parser):
+    left, right = _armies(args, parser)
+    start = time.perf_counter()
+    monster_data = simulate.load_monster_data(args.monsters)
+    load = time.perf_counter() - start
+    frames = 0
+    start = time.perf_counter()
+    for i in range(args.repeat):
+        _, rounds = _battle(monster_data, left, right, args.seed + i, args.fps)
+        frames += rounds
+    elapsed = time.perf_counter() - start
+    print(f"加载模板 {load * 1000:.1f}ms")
+    print(f"{args.repeat} 场，{frames} 帧，耗时 {elapsed:.2f}s：{args.repeat / elapsed:.2f} 场/秒，{frames / elapsed:.0f} 帧/秒")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m arknight", description="明日方舟斗蛐蛐模拟器")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="模拟一个对局")
+    p_run.add_argument("scene", nargs="?", help="scene.json 格式的对局文件")
+    p_run.add_argument("--left", help="左边阵容（JSON）")
+    p_run.add_argument("--right", help="右边阵容（JSON）")
+    p_run.add_argument("--trials", type=_positive_int, default=1)
+    p_run.add_argument("--seed", type=int, default=None)
+    p_run.add_argument("--fps", type=_positive_int, default=VIRTUAL_TIME_STEP, help="模拟帧率")
+    p_run.add_argument("--visualize", action="store_true", help="在终端里显示战场")
+
+    p_eval = sub.add_parser("evaluate", help="在带标签的数据集上评估预测准确率")
+    p_eval.add_argument("csv")
+    p_eval.add_argument("--limit", type=int, default=None, help="只使用前多少个对局")
+    p_eval.add_argument("--errors", default="errors.json", help="误判对局的输出文件")
+
+    p_bench = sub.add_parser("bench", help="测量一个对局的模拟速度")
+    p_bench.add_argument("scene", nargs="?", help="scene.json 格式的对局文件")
+    p_bench.add_argument("--left", help="左边阵容（JSON）")
+    p_bench.add_argument("--right", help="右边阵容（JSON）")
+    p_bench.add_argument("--repeat", type=_positive_int, default=5)
+    p_bench.add_argument("--seed", type=int, default=0)
+    p_bench.add_argument("--fps", type=_positive_int, default=VIRTUAL_TIME_STEP, help="模拟帧率")
+    args = parser.parse_args(argv)
+
+    if not getattr(args, "visualize", False):
+        utils.VISUALIZATION_MODE = False
+    {"run": cmd_run, "evaluate": cmd_evaluate, "bench": cmd_bench}[args.command](args, parser)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+公共随机数 A/B 测试
+
+比较两次独立的 simulate.main 正确率时，两边各自的随机波动很容易盖过真实的差异。这里让两个引擎配置
+（两份 monsters.json，或者并排加载的两份代码，比如另一个分支的 git worktree）在同样的对局上使用同样的
+种子序列（Battlefield 的所有随机数都来自 battlefield.rng），逐行配对比较：
+- 每行每个配置跑 trials 局取多数，得到预测；
+- 两边预测都对或都错的行不携带差异信息，只有一边对的行进入 McNemar 精确检验；
+- 同时给出配对与独立两种情况下正确率差的标准误，二者平方之比约等于配对后达到同样精度所需对局数的缩减倍数。
+
+用法（在包的上一级目录）：
+    python -m arknight.ab_test arknight/arknights53.csv --b-monsters /tmp/monsters_new.json --limit 200
+    python -m arknight.ab_test arknight/arknights53.csv --b-package /tmp/other-branch/arknight --limit 200
+"""
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import math
+import os
+import sys
+import time
+
+from . import simulate, utils
+from .utils import canonical_matchup
+
+
+def load_package(path, name):
+    """以 name 为包名导入 path 处的另一份代码，与当前包互不干扰"""
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(path, "__init__.py"),
+                                                      submodule_search_locations=[path])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[name] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f"{name}.simulate"), importlib.import_module(f"{name}.battle_field")
+
+
+class Arm:
+    """A/B 测试的一边：一份代码和一份怪物模板"""
+    def __init__(self, label, package_path=None, monster_path=simulate.MONSTER_DATA_PATH):
+        self.label = label
+        if package_path is None:
+            from . import battle_field
+            self.simulate, self.battle_field = simulate, battle_field
+        else:
+            self.simulate, self.battle_field = load_package(os.path.abspath(package_path), f"_ab_{label}")
+        importlib.import_module(f"{self.simulate.__package__}.utils").VISUALIZATION_MODE = False
+        self.monster_data = self.simulate.load_monster_data(monster_path)
+        self.battles = 0
+
+    def predict(self, left_army, right_army, seeds):
+        """用给定的种子各跑一局，返回左边是否赢了多数"""
+        wins = 0
+        for seed in seeds:
+            battlefield = self.battle_field.Battlefield(self.monster_data, seed=seed)
+            if not battlefield.setup_battle(left_army, right_army, self.monster_data):
+                continue
+            # 两份代码的 Faction 是不同的类，按名字比较
+            wins += battlefield.run_battle().name == "LEFT"
+            battlefield.release_summons()
+            self.battles += 1
+        return wins * 2 > len(seeds)
+
+
+def row_seeds(scene_config, trials, seed):
+    """由阵容和基础种子决定的种子序列，两边共用"""
+    key = canonical_matchup(scene_config["left"], scene_config["right"])
+    base = int(hashlib.sha1(f"{seed}:{key}".encode('utf-8')).hexdigest()[:15], 16)
+    return [base + i for i in range(trials)]
+
+
+def mcnemar_exact(b, c):
+    """McNemar 精确检验（双侧）：b、c 是两种不一致的行数"""
+    n = b + c
+    if n == 0:
+        return 1.0
+    tail = sum(math.comb(n, k) for k in range(min(b, c) + 1)) / 2 ** n
+    return min(1.0, 2 * tail)
+
+
+class ABResult:
+    def __init__(self):
+        self.rows = 0
+        self.both_correct = 0
+        self.only_a = 0  # 只有 A 预测正确
+        self.only_b = 0  # 只有 B 预测正确
+        self.both_wrong = 0
+        self.flipped = 0  # 两边预测不同的行（不论对错）
+
+    def record(self, actual, a_left_win, b_left_win):
+        a_correct = a_left_win == (actual == "left")
+        b_correct = b_left_win == (actual == "left")
+        self.rows += 1
+        self.flipped += a_left_win != b_left_win
+        if a_correct and b_correct:
+            self.both_correct += 1
+        elif a_correct:
+            self.only_a += 1
+        elif b_correct:
+            self.only_b += 1
+        else:
+            self.both_wrong += 1
+
+    @property
+    def accuracy_a(self):
+        return (self.both_correct + self.only_a) / self.rows if self.rows else 0.0
+
+    @property
+    def accuracy_b(self):
+        return (self.both_correct + self.only_b) / self.rows if self.rows else 0.0
+
+    @property
+    def p_value(self):
+        return mcnemar_exact(self.only_a, self.only_b)
+
+    def standard_errors(self):
+        """(配对的标准误, 两次独立运行的标准误)：B 正确率 - A 正确率"""
+        n = max(self.rows, 1)
+        diff = (self.only_b - self.only_a) / n
+        paired = math.sqrt(max((self.only_a + self.only_b) / n - diff ** 2, 0.0) / n)
+        pa, pb = self.accuracy_a, self.accuracy_b
+        independent = math.sqrt((pa * (1 - pa) + pb * (1 - pb)) / n)
+        return paired, independent
+
+    def summary(self, label_a="A", label_b="B"):
+        paired, independent = self.standard_errors()
+        diff = self.accuracy_b - self.accuracy_a
+        lines = [f"对局 {self.rows}：{label_a} 正确率 {self.accuracy_a:.2%}，{label_b} 正确率 {self.accuracy_b:.2%}，"
+                 f"差 {diff:+.2%}",
+                 f"预测改变 {self.flipped} 行；只有 {label_a} 对 {self.only_a} 行，只有 {label_b} 对 {self.only_b} 行，"
+                 f"McNemar 精确检验 p = {self.p_value:.4g}",
+                 f"正确率差的标准误：配对 {paired:.2%}，独立运行 {independent:.2%}"]
+        if paired > 0:
+            lines.append(f"配对后达到同样精度所需的对局数约为独立运行的 1/{(independent / paired) ** 2:.1f}")
+        return "\n".join(lines)
+
+
+def run_ab(arm_a, arm_b, battle_data, trials=1, seed=0):
+    result = ABResult()
+    for scene_config in battle_data:
+        seeds = row_seeds(scene_config, trials, seed)
+        a = arm_a.predict(scene_config["left"], scene_config["right"], seeds)
+        b = arm_b.predict(scene_config["left"], scene_config["right"], seeds)
+        result.record(scene_config["result"], a, b)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用公共随机数配对比较两个引擎配置的预测正确率")
+    parser.add_argument("csv", help="带标签的对局数据集")
+    parser.add_argument("--a-package", default=None, help="A 使用的代码目录，默认当前包")
+    parser.add_argument("--b-package", default=None, help="B 使用的代码目录，默认当前包")
+    parser.add_argument("--a-monsters", default=simulate.MONSTER_DATA_PATH, help="A 使用的怪物模板")
+    parser.add_argument("--b-monsters", default=simulate.MONSTER_DATA_PATH, help="B 使用的怪物模板")
+    parser.add_argument("--limit", type=int, default=200, help="只使用前多少个对局")
+    parser.add_argument("--trials", type=int, default=1, help="每行每边模拟的局数，取多数")
+    parser.add_argument("--seed", type=int, default=0, help="基础种子")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    arm_a = Arm("a", args.a_package, args.a_monsters)
+    arm_b = Arm("b", args.b_package, args.b_monsters)
+    battle_data = simulate.process_battle_data(args.csv)[:args.limit]
+    start = time.perf_counter()
+    result = run_ab(arm_a, arm_b, battle_data, args.trials, args.seed)
+    print(result.summary())
+    print(f"{arm_a.battles + arm_b.battles} 场，耗时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+移动热路径的分配基准
+
+在一场真实对局进行到中途时，对每个单位反复调用 move_toward_enemy 和 do_move（碰撞、速度混合、积分），
+统计每个单位帧：
+- 创建的 FastVector 个数；
+- tracemalloc 观察到的临时内存峰值（字节）；
+- 耗时（不开 tracemalloc 时单独测量）。
+
+用法（在包的上一级目录）：
+    python -m arknight.alloc_bench --row 0 --warmup 300 --frames 200
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from .battle_field import Battlefield
+from .vector2d import FastVector
+
+
+def _prepare(monster_data, scene, seed, warmup):
+    battlefield = Battlefield(monster_data, seed=seed)
+    if not battlefield.setup_battle(scene["left"], scene["right"], monster_data):
+        raise ValueError("无法开始对局")
+    for _ in range(warmup):
+        if battlefield.run_one_frame() is not None:
+            break
+    return battlefield
+
+
+def _movement_frame(battlefield):
+    delta_time = battlefield.delta_time
+    for m in battlefield.monsters:
+        m.move_toward_enemy(delta_time)
+    for m in battlefield.monsters:
+        m.do_move(delta_time)
+    return len(battlefield.monsters)
+
+
+def measure(monster_data, scene, seed=0, warmup=300, frames=200):
+    # 计时：原样运行
+    battlefield = _prepare(monster_data, scene, seed, warmup)
+    units = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        units += _movement_frame(battlefield)
+    elapsed = time.perf_counter() - start
+
+    # 计数：统计 FastVector 的构造次数和 tracemalloc 的峰值
+    battlefield = _prepare(monster_data, scene, seed, warmup)
+    created = 0
+    init = FastVector.__init__
+
+    def counting_init(self, x, y):
+        nonlocal created
+        created += 1
+        init(self, x, y)
+
+    peak = 0
+    FastVector.__init__ = counting_init
+    tracemalloc.start()
+    try:
+        delta_time = battlefield.delta_time
+        for _ in range(frames):
+            for step in ("move_toward_enemy", "do_move"):
+                for m in battlefield.monsters:
+                    base = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    getattr(m, step)(delta_time)
+                    peak += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+        FastVector.__init__ = init
+
+    unit_frames = max(units, 1)
+    return {
+        "unit_frames": units,
+        "vectors_per_unit_frame": created / unit_frames,
+        "peak_bytes_per_unit_frame": peak / unit_frames,
+        "microseconds_per_unit_frame": elapsed / unit_frames * 1e6,
+    }
+
+
+def main(argv=None):
+    from . import simulate, utils
+
+    parser = argparse.ArgumentParser(description="统计移动热路径每个单位帧的分配")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "arknights53.csv"))
+    parser.add_argument("--row", type=int, default=0, help="使用数据集的第几个对局")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=300, help="开始测量前先跑多少帧")
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scene = simulate.process_battle_data(args.csv)[args.row]
+    r = measure(monster_data, scene, args.seed, args.warmup, args.frames)
+    print(f"单位帧 {r['unit_frames']}：FastVector {r['vectors_per_unit_frame']:.2f} 个，"
+          f"临时内存峰值 {r['peak_bytes_per_unit_frame']:.0f} 字节，耗时 {r['microseconds_per_unit_frame']:.2f} 微秒")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
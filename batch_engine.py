@@ -0,0 +1,378 @@
+"""
+批量锁步战斗引擎
+
+同一场对局重复跑很多次时，逐帧的 Python 循环是最大的开销。
+这里把 B 场独立战斗的单位状态放进形状为 (B, N) 的数组里，
+移动、碰撞、索敌和伤害都用 NumPy 一次性算完，已经分出胜负的战斗会从活跃掩码中移除。
+
+只支持行为可以完全用数组描述的怪物（见 BATCH_SUPPORTED），
+其他怪物请继续使用单场的 Battlefield。
+最近敌人、碰撞和移动的计算在 kernels.py 中，安装了 Numba 时自动使用编译版本。
+与 Battlefield 一样，超过 max_game_time 或者 stalemate_time 秒内没有生命值变化的战斗以平局结束，
+winners 中记为 DRAW_OFFSET + Draw.value。
+"""
+import numpy as np
+
+from .battle_field import MAX_GAME_TIME, STALEMATE_TIME
+from .kernels import get_kernels
+from .monsters import AcidSlug, AttackState, Monster, MonsterFactory, 光剑, 宿主流浪者, 狂暴宿主组长, 爱蟹者, 绵羊, 雪境精锐, 鳄鱼
+from .utils import MOVE_SPEED_SCALE, VIRTUAL_TIME_DELTA, DamageType, Draw, Faction
+from .vector2d import FastVector
+
+MAP_SIZE = np.array([13, 9])
+HIT_BOX_RADIUS = 0.2
+
+# 攻击状态编号，与 AttackState 保持一致
+STATE_WINDUP = AttackState.前摇.value
+STATE_RECOVERY = AttackState.后摇.value
+STATE_IDLE = AttackState.等待.value
+
+# winners 的编号：Faction.value 是胜方，DRAW_OFFSET + Draw.value 是平局，-1 是还没有结束
+DRAW_OFFSET = len(Faction)
+
+# 批量引擎支持的怪物类型，以及它们相对基础 Monster 的额外行为
+# 数值含义：(每秒生命变化, 命中后降低目标的物理防御)
+BATCH_SUPPORTED = {
+    Monster: (0, 0),
+    爱蟹者: (0, 0),
+    绵羊: (0, 0),
+    光剑: (0, 0),
+    宿主流浪者: (250, 0),
+    狂暴宿主组长: (-350, 0),
+    AcidSlug: (0, 15),
+    鳄鱼: (0, 10),
+    雪境精锐: (0, 100),
+}
+
+
+def _spawn_rounds(count):
+    """第k个出场的单位在哪一帧进场（偶数帧出场，40~90帧暂停）"""
+    rounds = []
+    r = 0
+    while len(rounds) < count:
+        r += 1
+        if (r < 40 or r > 90) and r % 2 == 0:
+            rounds.append(r)
+    return np.array(rounds, dtype=np.int64)
+
+
+class BatchBattlefield:
+    def __init__(self, monster_data, batch_size, seed=None, backend=None, max_game_time=MAX_GAME_TIME,
+                 stalemate_time=STALEMATE_TIME):
+        self.monster_data = monster_data
+        # "numpy" 或 "numba"，为 None 时使用 kernels.default_backend()
+        self.kernels = get_kernels(backend)
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.map_size = MAP_SIZE
+        self.round = 0
+        self.gameTime = 0
+        # 为 None 时不做对应的平局判定
+        self.max_game_time = max_game_time
+        self.stalemate_time = stalemate_time
+
+    @staticmethod
+    def supports(left_army, right_army, monster_data):
+        """判断这场对局是否可以用批量引擎模拟"""
+        for army in (left_army, right_army):
+            for name in army:
+                data = next((m for m in monster_data if m["名字"] == name), None)
+                if data is None:
+                    return False
+                if MonsterFactory._monster_classes.get(name, Monster) not in BATCH_SUPPORTED:
+                    return False
+        return True
+
+    def _prototype(self, data, faction):
+        """用工厂创建一个原型怪物，读出 on_spawn 之后的初始属性"""
+        return MonsterFactory.create_monster(data, faction, FastVector(0, 0), None)
+
+    def setup_battle(self, left_army, right_army):
+        """初始化 B 场相同配置的战斗"""
+        if not self.supports(left_army, right_army, self.monster_data):
+            return False
+
+        units = []
+        for faction, army in ((Faction.LEFT, left_army), (Faction.RIGHT, right_army)):
+            for (name, count) in army.items():
+                data = next(m for m in self.monster_data if m["名字"] == name)
+                proto = self._prototype(data, faction)
+                units.extend([proto] * count)
+
+        B, N = self.batch_size, len(units)
+        self.num_units = N
+
+        def column(getter, dtype=np.float64):
+            return np.tile(np.array([getter(u) for u in units], dtype=dtype), (B, 1))
+
+        # 模板属性
+        self.faction = np.array([u.faction.value for u in units], dtype=np.int8)
+        self.is_melee = np.array([u.attack_range <= 0.8 for u in units])
+        self.magic = np.array([u.attack_type == DamageType.MAGIC for u in units])
+        self.attack_range = np.array([u.attack_range for u in units])
+        self.attack_interval = np.array([u.attack_interval for u in units])
+        self.windup_time = np.array([u.attack_animation.前摇时间 * u.attack_interval for u in units])
+        self.recovery_time = self.windup_time + np.array([u.attack_animation.后摇时间 * u.attack_interval for u in units])
+        self.regen = np.array([BATCH_SUPPORTED[type(u)][0] for u in units], dtype=np.float64)
+        self.def_shred = np.array([BATCH_SUPPORTED[type(u)][1] for u in units], dtype=np.float64)
+        self.enemy = self.faction[:, None] != self.faction[None, :]
+        self.same_faction = ~self.enemy
+        np.fill_diagonal(self.same_faction, False)
+
+        # 每场战斗独立的状态
+        self.attack_power = column(lambda u: u.attack_power)
+        self.base_move_speed = column(lambda u: u.move_speed)
+        self.health = column(lambda u: u.health)
+        self.max_health = column(lambda u: u.max_health)
+        self.phy_def = column(lambda u: u.phy_def)
+        self.magic_resist = column(lambda u: u.magic_resist)
+        self.attack_time_counter = column(lambda u: u.attack_time_counter)
+        self.attack_state = np.full((B, N), STATE_IDLE, dtype=np.int8)
+        self.frame_counter = np.zeros((B, N), dtype=np.int64)
+        self.velocity = np.zeros((B, N, 2))
+        self.target = np.full((B, N), -1, dtype=np.int64)
+        self.blocked = np.zeros((B, N), dtype=bool)
+        self.alive = np.zeros((B, N), dtype=bool)
+        self.dead = np.zeros((B, N), dtype=bool)
+
+        # 毒圈（源石地板）状态
+        self.stone_duration = np.zeros((B, N))
+        self.stone_counter = np.zeros((B, N))
+        self.stone_active = np.zeros((B, N), dtype=bool)
+
+        # 出生位置和出场顺序
+        left = self.faction == Faction.LEFT.value
+        right = ~left
+        self.position = np.empty((B, N, 2))
+        self.position[:, left, 0] = self.rng.uniform(0, 0.5, (B, left.sum()))
+        self.position[:, right, 0] = self.rng.uniform(MAP_SIZE[0] - 0.5, MAP_SIZE[0], (B, right.sum()))
+        self.position[:, :, 1] = self.rng.uniform(0, MAP_SIZE[1], (B, N))
+
+        self.spawn_round = np.empty((B, N), dtype=np.int64)
+        for mask in (left, right):
+            count = int(mask.sum())
+            if count == 0:
+                continue
+            rounds = _spawn_rounds(count)
+            order = self.rng.permuted(np.tile(np.arange(count), (B, 1)), axis=1)
+            self.spawn_round[:, mask] = rounds[order]
+        self.last_spawn_round = int(self.spawn_round.max()) if N > 0 else 0
+
+        # 活跃掩码：battle_index[k] 是第k行对应的原始战斗编号
+        self.battle_index = np.arange(B)
+        self.winners = np.full(B, -1, dtype=np.int8)
+        self.end_rounds = np.zeros(B, dtype=np.int64)
+        # 僵局判定：每场战斗上一次存活数或者总生命值变化的时间
+        self.last_health_total = np.full((B, 2), np.nan)
+        self.last_health_change_time = np.zeros(B)
+        self.round = 0
+        self.gameTime = 0
+        return True
+
+    def _compact(self, keep):
+        """把已经结束的战斗从所有状态数组里移除"""
+        for name in ("attack_power", "base_move_speed", "health", "max_health", "phy_def", "magic_resist",
+                     "attack_time_counter", "attack_state", "frame_counter", "velocity", "target", "blocked",
+                     "alive", "dead", "stone_duration", "stone_counter", "stone_active", "position",
+                     "spawn_round", "battle_index", "last_health_total", "last_health_change_time"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def danger_zone_size(self):
+        if self.gameTime < 60:
+            return 0
+        return int((self.gameTime - 60) / 20) + 1
+
+    def _kill(self, mask):
+        died = mask & self.alive & (self.health <= 0)
+        self.alive &= ~died
+        self.dead |= died
+
+    def _check_zone(self):
+        """毒圈：在圈内的单位刷新源石地板效果"""
+        size = self.danger_zone_size()
+        if size <= 0:
+            return
+        x = self.position[:, :, 0]
+        y = self.position[:, :, 1]
+        inside = self.alive & ((x < size + 1) | (x > MAP_SIZE[0] - size - 1) | (y < size) | (y > MAP_SIZE[1] - size))
+        entering = inside & ~self.stone_active
+        self.stone_active |= entering
+        self.stone_counter[entering] = 0
+        self.stone_duration = np.where(inside, np.maximum(self.stone_duration, VIRTUAL_TIME_DELTA * 2), self.stone_duration)
+
+    def _update_status(self, delta_time):
+        """源石地板的持续时间和持续伤害"""
+        self.stone_duration = np.where(self.alive & self.stone_active, self.stone_duration - delta_time, self.stone_duration)
+        expired = self.alive & self.stone_active & (self.stone_duration <= 0)
+        self.stone_active &= ~expired
+        self.stone_counter[expired] = 0
+
+        ticking = self.alive & self.stone_active
+        self.stone_counter[ticking] += delta_time
+        hit = ticking & (self.stone_counter % 1 < delta_time)
+        self.health -= np.where(hit, 0.005 * self.max_health * self.stone_counter, 0)
+        self._kill(hit)
+
+    def _stats(self):
+        """源石地板会修改攻速、攻击倍率和移速"""
+        attack_speed = np.where(self.stone_active, 150, 100)
+        attack_multiplier = np.where(self.stone_active, 2, 1)
+        move_speed = np.where(self.stone_active, self.base_move_speed * 1.5, self.base_move_speed)
+        return attack_speed, attack_multiplier, move_speed
+
+    def _nearest_enemy(self):
+        """每个单位最近的存活敌人，以及到所有单位的距离"""
+        return self.kernels.nearest_enemy(self.position, self.alive, self.enemy)
+
+    def _target_distance(self, target, dist):
+        safe = np.maximum(target, 0)
+        d = np.take_along_axis(dist, safe[..., None], axis=-1)[..., 0]
+        valid = (target >= 0) & np.take_along_axis(self.alive, safe, axis=-1)
+        return np.where(valid, d, np.inf), valid
+
+    def _move_toward_enemy(self, acting, move_speed, diff, dist):
+        """速度插值以及友军之间的碰撞挤出"""
+        d, valid = self._target_distance(self.target, dist)
+        self.blocked = acting & valid & (d <= self.attack_range)
+
+        safe = np.maximum(self.target, 0)
+        direction = np.take_along_axis(diff, safe[..., None, None], axis=2)[:, :, 0, :]
+        norm = np.linalg.norm(direction, axis=-1, keepdims=True)
+        direction = np.where((valid & ~self.blocked)[..., None] & (norm > 0), direction / np.where(norm > 0, norm, 1), 0)
+
+        steer = acting & ~self.blocked & (self.attack_state == STATE_IDLE)
+        blended = (self.velocity * 7 + direction * move_speed[..., None]) / 8
+        self.velocity = np.where(steer[..., None], blended, self.velocity)
+
+        # 碰撞检测
+        self.kernels.collide(self.velocity, acting, self.alive, self.same_faction, self.blocked, diff, dist, HIT_BOX_RADIUS)
+
+    def _attack(self, acting, attack_speed, attack_multiplier, dist):
+        """攻击状态机和伤害结算"""
+        d, valid = self._target_distance(self.target, dist)
+        in_range = valid & (d <= self.attack_range)
+        increment = VIRTUAL_TIME_DELTA * np.clip(attack_speed, 10, 600) / 100
+
+        no_target = acting & ~valid
+        reset = no_target & (self.attack_state == STATE_WINDUP)
+        windup = acting & valid & (self.attack_state == STATE_WINDUP)
+        recovery = acting & valid & (self.attack_state == STATE_RECOVERY)
+        idle = acting & valid & (self.attack_state == STATE_IDLE)
+
+        reset |= windup & ~in_range
+        counting = (windup & in_range) | recovery | idle
+        self.attack_time_counter = np.where(counting, self.attack_time_counter + increment, self.attack_time_counter)
+
+        fire = windup & in_range & (self.attack_time_counter >= self.windup_time)
+        recovered = recovery & (self.attack_time_counter >= self.recovery_time)
+        start = idle & in_range & (self.attack_time_counter >= self.attack_interval)
+
+        self.attack_state[fire] = STATE_RECOVERY
+        self.attack_state[recovered] = STATE_IDLE
+        self.attack_state[start] = STATE_WINDUP
+        self.attack_time_counter[start] = 0
+        self.attack_state[reset] = STATE_IDLE
+        self.attack_time_counter = np.where(reset, self.attack_interval, self.attack_time_counter)
+
+        if not fire.any():
+            return
+        rows, cols = np.nonzero(fire)
+        targets = self.target[rows, cols]
+        damage = attack_multiplier[rows, cols] * self.attack_power[rows, cols]
+        defense = self.phy_def[rows, targets]
+        resist = self.magic_resist[rows, targets]
+        dealt = np.where(self.magic[cols],
+                         np.maximum(damage * 0.05, damage * (1.0 - resist / 100)),
+                         np.maximum(damage - defense, damage * 0.05))
+        np.subtract.at(self.health, (rows, targets), dealt)
+        np.subtract.at(self.phy_def, (rows, targets), self.def_shred[cols])
+        np.maximum(self.phy_def, 0, out=self.phy_def)
+        self._kill(self.alive)
+
+    def _do_move(self, move_speed, delta_time):
+        slow = self.blocked | (self.attack_state != STATE_IDLE)
+        self.kernels.do_move(self.position, self.velocity, self.alive, slow, move_speed, delta_time, MOVE_SPEED_SCALE, MAP_SIZE)
+
+    def run_one_frame(self):
+        self.round += 1
+        delta_time = VIRTUAL_TIME_DELTA
+
+        self._check_zone()
+        spawned = self.spawn_round == self.round
+        self.alive |= spawned
+
+        acting = self.alive.copy()
+        self.frame_counter[acting] += 1
+
+        # 额外更新：回血/掉血
+        self.health = np.where(acting, self.health + self.regen * delta_time, self.health)
+        self.health = np.where(acting & (self.regen > 0), np.minimum(self.health, self.max_health), self.health)
+        self._kill(acting)
+        self._update_status(delta_time)
+        acting &= self.alive
+
+        attack_speed, attack_multiplier, move_speed = self._stats()
+        nearest, diff, dist = self._nearest_enemy()
+
+        # 目标失效或者离开攻击范围时重新索敌
+        d, valid = self._target_distance(self.target, dist)
+        retarget = acting & (~valid | (d > self.attack_range))
+        self.target = np.where(retarget, nearest, self.target)
+
+        self._move_toward_enemy(acting, move_speed, diff, dist)
+
+        # 近战单位每3帧重新索敌
+        melee = acting & self.is_melee & (self.frame_counter % 3 == 0)
+        self.target = np.where(melee, nearest, self.target)
+
+        self._attack(acting, attack_speed, attack_multiplier, dist)
+        self._do_move(move_speed, delta_time)
+
+        # 检查胜利条件
+        if self.round >= self.last_spawn_round:
+            left_alive = (self.alive & (self.faction == Faction.LEFT.value)).any(axis=1)
+            right_alive = (self.alive & (self.faction == Faction.RIGHT.value)).any(axis=1)
+            finished = ~(left_alive & right_alive)
+            if finished.any():
+                winner = np.where(right_alive & ~left_alive, Faction.RIGHT.value, Faction.LEFT.value)
+                self._finish(finished, winner[finished])
+
+        self._check_draw()
+        self.gameTime += delta_time
+        return len(self.battle_index) == 0
+
+    def _finish(self, finished, code):
+        index = self.battle_index[finished]
+        self.winners[index] = code
+        self.end_rounds[index] = self.round
+        self._compact(~finished)
+
+    def _check_draw(self):
+        """超时和僵局，规则与 Battlefield.check_draw 相同"""
+        if len(self.battle_index) == 0:
+            return
+        if self.max_game_time is not None and self.gameTime >= self.max_game_time:
+            self._finish(np.ones(len(self.battle_index), dtype=bool), DRAW_OFFSET + Draw.TIMEOUT.value)
+            return
+        if self.stalemate_time is None:
+            return
+        health_total = np.stack([self.alive.sum(axis=1), np.where(self.alive, self.health, 0).sum(axis=1)], axis=1)
+        changed = (health_total != self.last_health_total).any(axis=1)
+        self.last_health_total[changed] = health_total[changed]
+        self.last_health_change_time[changed] = self.gameTime
+        stalled = ~changed & (self.gameTime - self.last_health_change_time >= self.stalemate_time)
+        if stalled.any():
+            self._finish(stalled, DRAW_OFFSET + Draw.STALEMATE.value)
+
+    def outcomes(self):
+        """每场的结局：Faction 或者 Draw"""
+        return [Faction(w) if w < DRAW_OFFSET else Draw(w - DRAW_OFFSET) for w in self.winners.tolist()]
+
+    def run_battle(self):
+        """运行所有战斗直到全部分出胜负或者平局，返回每场的结局编号（见 DRAW_OFFSET）"""
+        while not self.run_one_frame():
+            pass
+        return self.winners
+
+    def left_win_rate(self):
+        return float(np.mean(self.winners == Faction.LEFT.value))
@@ -3,6 +3,7 @@ import math
 import random
 import time
 import numpy as np
+from contextlib import nullcontext
 from enum import Enum
 
 from typing import TYPE_CHECKING
@@ -13,28 +14,67 @@ from .vector2d import FastVector
 if TYPE_CHECKING:
     from .monsters import Monster
     
+from .damage_table import damage_table_for
 from .monsters import MonsterFactory
-from .utils import VIRTUAL_TIME_DELTA, BuffEffect, BuffType, Faction, SpatialHash
+from .utils import MOVE_SPEED_SCALE, VIRTUAL_TIME_STEP, BuffEffect, BuffType, Draw, Faction, LaneIndex, ProximityTrigger, SpatialHash, debug_print, redirect_debug_print
 from .zone import PoisonZone
 
 # 场景参数
 MAP_SIZE = np.array([13, 9])  # 场景宽度（单位：格）
 SPAWN_AREA = 2  # 阵营出生区域宽度
+MAX_GAME_TIME = 300  # 最大游戏时间（秒），超过判为平局
+STALEMATE_TIME = 60  # 这么多秒内没有任何生命值变化判为僵局
+# 出怪按 30 帧/秒 的参考帧计时：每 2 个参考帧双方各出一个，这段参考帧内暂停
+SPAWN_INTERVAL = 2
+SPAWN_PAUSE = (40, 90)
+MELEE_RETARGET_PERIOD = 0.1  # 近战单位重新选择目标的间隔（秒）
 
 
 from collections import defaultdict
 from .projectiles import ProjectileManager
+from .renderer import TerminalRenderer
+from .snapshot import BattleSnapshot, copy_battlefield
 
 class Battlefield:
-    def __init__(self, monster_data):
+    # 挂在战场上的工具而不是战斗状态：快照和分叉不复制，恢复快照时保留当前的
+    ATTACHMENTS = ("recorder", "accelerator")
+    def __init__(self, monster_data, seed=None, max_game_time=MAX_GAME_TIME, stalemate_time=STALEMATE_TIME,
+                 time_step=VIRTUAL_TIME_STEP):
+        # monsters 和 alive_monsters 只保留存活的单位，按加入顺序排列
         self.monsters : list[Monster] = []
         self.alive_monsters : list[Monster] = []
+        # id -> 单位，包括已经死亡的
+        self.monster_table : list[Monster] = []
+        self.alive_count = {Faction.LEFT: 0, Faction.RIGHT: 0}
+        # 战斗中召唤出的单位，战斗结束后可以放回对象池
+        self.summons : list[Monster] = []
+        # 上一帧以来有单位加入或死亡
+        self.roster_changed = False
         self.hash_grid : SpatialHash = SpatialHash(self, cell_size=0.5)
+        self.lane_index = LaneIndex(self)
+        # 寻敌缓存的失效条件：每个阵营出现新的可选取单位时版本号加一；所有单位累计移动距离的上界
+        self.target_epoch = {Faction.LEFT: 0, Faction.RIGHT: 0}
+        self.spawned_factions = set()
+        self.motion = 0.0
+        self.retarget_searches = 0
+        self.retarget_skipped = 0
+        # 技能的距离触发器，每帧开始时统一判定
+        self.triggers : list[ProximityTrigger] = []
         self.HIT_BOX_RADIUS = 0.2
 
         self.round = 0
+        # 每秒帧数。逐帧的速度混合和减速按帧率换算成相同的每秒效果
+        self.time_step = time_step
+        self.delta_time = 1.0 / time_step
+        frames = VIRTUAL_TIME_STEP / time_step
+        self.velocity_blend = (7 / 8) ** frames
+        self.velocity_damping = 0.5 ** frames
+        self.retarget_interval = max(1, round(MELEE_RETARGET_PERIOD * time_step))
+        # 当前帧覆盖的 30 帧/秒 参考帧数，持续伤害等按参考帧计时的逻辑每个参考帧走一步
+        self.reference_steps = 0
         self.map_size = MAP_SIZE
         self.monster_data = monster_data
+        self.damage_table = damage_table_for(monster_data)
         self.globalId = 0
         self.effect_zones = []
         self.dead_count = {Faction.LEFT: 0, Faction.RIGHT: 0}
@@ -49,16 +89,32 @@ class Battlefield:
         self.current_spawn_left = 0
         self.current_spawn_right = 0
 
+        # 超时与僵局检测，设为 None 表示不检测
+        self.max_game_time = max_game_time
+        self.stalemate_time = stalemate_time
+        self.last_health_total = None
+        self.last_health_change_time = 0
+
+        # 帧快照记录器（FrameRecorder），为 None 时不记录
+        self.recorder = None
+        # 接敌前快进（ApproachFastForward），为 None 时始终逐帧模拟
+        self.accelerator = None
+
+        # 随机数发生器，不指定种子时沿用全局的 random 模块
+        self.rng = random if seed is None else random.Random(seed)
+
     def query_monster(self, target_position, radius) -> list['Monster']:
         results = []
+        # 与 (m.position - target_position).magnitude <= radius 相同，但不创建临时向量
+        x, y = target_position.x, target_position.y
         if len(self.alive_monsters) < (radius / self.hash_grid.cell_size) ** 2:
             for m in self.alive_monsters:
-                if m.is_alive and (m.position - target_position).magnitude <= radius:
+                if m.is_alive and math.sqrt((m.position.x - x)**2 + (m.position.y - y)**2) <= radius:
                     results.append(m)
         else:
             for id in self.hash_grid.query_neighbors(target_position, radius):
                 m = self.get_monster_with_id(id)
-                if m.is_alive and (m.position - target_position).magnitude <= radius:
+                if m.is_alive and math.sqrt((m.position.x - x)**2 + (m.position.y - y)**2) <= radius:
                     results.append(m)
         return results
 
@@ -68,21 +124,106 @@ class Battlefield:
         monster.id = id
         self.globalId += 1
         self.monsters.append(monster)
+        self.monster_table.append(monster)
+        self.alive_count[monster.faction] += 1
+        self.roster_changed = True
+        self.spawned_factions.add(monster.faction)
         self.hash_grid.insert(monster.position, monster.id)
-    
+        self.lane_index.invalidate()
+
     def append_monster_name(self, name, faction, pos) -> 'Monster':
         """添加一个怪物到战场，只需要名字"""
         data = next((m for m in self.monster_data if m["名字"] == name), None)
-        id = self.globalId
-        monster = MonsterFactory.create_monster(data, faction, pos, self)
-        monster.id = id
-        self.globalId += 1
-        self.monsters.append(monster)
-        self.hash_grid.insert(monster.position, monster.id)
+        monster = MonsterFactory.acquire_monster(data, faction, pos, self)
+        self.append_monster(monster)
+        self.summons.append(monster)
         return monster
 
+    def release_summons(self):
+        """战斗结束后把召唤物放回对象池，供同一进程里的下一场战斗复用。
+        调用之后这个战场不能再继续使用，也不能再查看召唤物"""
+        for monster in self.summons:
+            MonsterFactory.release_monster(monster)
+        self.summons = []
+
+    def retire_monster(self, monster : 'Monster'):
+        """怪物真正死亡后调用，帧末会把它从 monsters 和 alive_monsters 中移除"""
+        self.alive_count[monster.faction] -= 1
+        self.roster_changed = True
+        for trigger in monster.triggers:
+            self.triggers.remove(trigger)
+        monster.triggers = []
+
+    def invalidate_targets(self, faction):
+        """faction 阵营有单位变得可以被选取（或者嘲讽等级变化），敌方缓存的寻敌结果失效"""
+        self.target_epoch[faction] += 1
+
+    def add_proximity_trigger(self, owner : 'Monster', radius, callback, once=False) -> ProximityTrigger:
+        """有可选取的敌人进入 owner 半径 radius 内时，在 owner 的 on_extra_update 之后调用 callback(敌人列表)"""
+        return self._add_trigger(ProximityTrigger(owner, radius, callback, once))
+
+    def add_target_range_trigger(self, owner : 'Monster', radius, callback, leave=False, once=False) -> ProximityTrigger:
+        """owner 的当前目标在半径内（leave=True 时为半径外）时调用 callback(目标)"""
+        return self._add_trigger(ProximityTrigger(owner, radius, callback, once, "leave" if leave else "enter"))
+
+    def _add_trigger(self, trigger):
+        self.triggers.append(trigger)
+        trigger.owner.triggers.append(trigger)
+        return trigger
+
+    def remove_trigger(self, trigger : ProximityTrigger):
+        if trigger in self.triggers:
+            self.triggers.remove(trigger)
+            trigger.owner.triggers.remove(trigger)
+
+    def evaluate_triggers(self):
+        """每帧开始时判定所有触发器。单位只在 do_move 中移动，所以结果在整个更新阶段内都有效"""
+        for trigger in self.triggers:
+            owner = trigger.owner
+            trigger.matches = None
+            if not owner.is_alive:
+                continue
+            radius = trigger.get_radius()
+            if trigger.target_mode is None:
+                enemies = [m for m in self.query_monster(owner.position, radius) if m.faction != owner.faction]
+                if enemies:
+                    # 空间索引返回的顺序不固定，按 id（即 alive_monsters 的顺序）排列
+                    enemies.sort(key=lambda m: m.id)
+                    trigger.matches = enemies
+            elif owner.target is not None:
+                inside = (owner.target.position - owner.position).magnitude <= radius
+                if inside == (trigger.target_mode == "enter"):
+                    trigger.matches = owner.target
+
+    def fire_triggers(self, owner : 'Monster'):
+        """在 owner 自己的更新中调用本帧命中的触发器"""
+        for trigger in list(owner.triggers):
+            matches = trigger.matches
+            if matches is None:
+                continue
+            trigger.matches = None
+            if trigger.target_mode is None:
+                # 判定之后这一帧里可能有敌人死亡或变得不可选取
+                enemies = [m for m in matches if m.can_be_target()]
+                if not enemies:
+                    continue
+                info = []
+                for m in enemies:
+                    dist = (m.position - owner.position).magnitude
+                    info.append((-m.aggro if dist <= owner.attack_range else 0, dist, m))
+                info.sort(key=lambda e: (e[0], e[1]))
+                matches = [e[2] for e in info]
+            if trigger.once:
+                self.remove_trigger(trigger)
+            trigger.callback(matches)
+
+    def nearest_enemies_cardinal(self, monster : 'Monster', half_width=0.5):
+        """monster 上、下、左、右四个方向宽 2*half_width 的条带内最近的敌人（没有时为 None）"""
+        enemy = Faction.RIGHT if monster.faction == Faction.LEFT else Faction.LEFT
+        return self.lane_index.nearest_cardinal(enemy, monster.position, half_width)
+
     def get_monster_with_id(self, id) -> 'Monster':
-        return self.monsters[id]
+        return self.monster_table[id]
     
     def setup_battle(self, left_army, right_army, monster_data):
         """二维战场初始化"""
@@ -93,8 +234,8 @@ class Battlefield:
                 return False
             for _ in range(count):
                 pos = FastVector(
-                    random.uniform(0, 0.5),
-                    random.uniform(0, MAP_SIZE[1])
+                    self.rng.uniform(0, 0.5),
+                    self.rng.uniform(0, MAP_SIZE[1])
                 )
                 self.monster_temporal_area_left.append( MonsterFactory.create_monster(data, Faction.LEFT, pos, self))
 
@@ -105,39 +246,50 @@ class Battlefield:
                 return False
             for _ in range(count):
                 pos = FastVector(
-                    random.uniform(MAP_SIZE[0]-0.5, MAP_SIZE[0]),
-                    random.uniform(0, MAP_SIZE[1])
+                    self.rng.uniform(MAP_SIZE[0]-0.5, MAP_SIZE[0]),
+                    self.rng.uniform(0, MAP_SIZE[1])
                 )
                 self.monster_temporal_area_right.append(MonsterFactory.create_monster(data, Faction.RIGHT, pos, self))
 
-        self.alive_monsters = self.monsters
+        self.alive_monsters = list(self.monsters)
         self.gameTime = 0
         self.current_spawn = 0
-        random.shuffle(self.monster_temporal_area_left)
-        random.shuffle(self.monster_temporal_area_right)
+        self.rng.shuffle(self.monster_temporal_area_left)
+        self.rng.shuffle(self.monster_temporal_area_right)
         return True
 
     def check_victory(self):
         """检查胜利条件"""
         if self.current_spawn_left < len(self.monster_temporal_area_left) or self.current_spawn_right < len(self.monster_temporal_area_right):
             return None
-        alive_factions = set()
-        for m in self.alive_monsters:
-            if m.is_alive:
-                alive_factions.add(m.faction)
-        
-        if len(alive_factions) == 1:
-            return list(alive_factions)[0]
-        elif len(alive_factions) == 0:
-            return Faction.LEFT
+        left = self.alive_count[Faction.LEFT]
+        right = self.alive_count[Faction.RIGHT]
+        if left > 0 and right > 0:
+            return None
+        if right > 0:
+            return Faction.RIGHT
+        return Faction.LEFT
+
+    def check_draw(self):
+        """检查超时和僵局"""
+        if self.max_game_time is not None and self.gameTime >= self.max_game_time:
+            return Draw.TIMEOUT
+        if self.stalemate_time is None:
+            return None
+        health_total = (len(self.alive_monsters), sum(m.health for m in self.alive_monsters))
+        if health_total != self.last_health_total:
+            self.last_health_total = health_total
+            self.last_health_change_time = self.gameTime
+        elif self.gameTime - self.last_health_change_time >= self.stalemate_time:
+            return Draw.STALEMATE
         return None
     
     def check_zone(self):
         new_zone = []
         # 检查场地效果
         for zone in self.effect_zones:
-            zone.update(VIRTUAL_TIME_DELTA)
-            if zone.should_clear(VIRTUAL_TIME_DELTA):
+            zone.update(self.delta_time)
+            if zone.should_clear(self.delta_time):
                 continue
             for m in self.alive_monsters:
                 if zone.contains(m):
@@ -146,48 +298,127 @@ class Battlefield:
         self.effect_zones = new_zone
 
     def run_one_frame(self):
-        self.round += 1
+        self.advance_round()
+        self.lane_index.invalidate()
+        if self.triggers:
+            self.evaluate_triggers()
 
-        if self.round < 40 or self.round > 90:
-            if self.current_spawn_left < len(self.monster_temporal_area_left) and self.round % 2 == 0:
+        # 帧率不是 30 时一帧可能跨过多个参考帧
+        first = self.reference_frame(self.round) - self.reference_steps + 1
+        for ref in range(first, first + self.reference_steps):
+            if SPAWN_PAUSE[0] <= ref <= SPAWN_PAUSE[1] or ref % SPAWN_INTERVAL != 0:
+                continue
+            if self.current_spawn_left < len(self.monster_temporal_area_left):
                 self.append_monster(self.monster_temporal_area_left[self.current_spawn_left])
                 self.current_spawn_left += 1
 
-            if self.current_spawn_right < len(self.monster_temporal_area_right) and self.round % 2 == 0:
+            if self.current_spawn_right < len(self.monster_temporal_area_right):
                 self.append_monster(self.monster_temporal_area_right[self.current_spawn_right])
                 self.current_spawn_right += 1
 
+        delta_time = self.delta_time
         self.check_zone()
-        self.projectiles_manager.update_all(VIRTUAL_TIME_DELTA)
+        self.projectiles_manager.update_all(delta_time)
         # 更新所有单位
         for m in self.monsters:
-            m.update(VIRTUAL_TIME_DELTA)
+            m.update(delta_time)
+        max_speed = 0
         for m in self.monsters:
-            m.do_move(VIRTUAL_TIME_DELTA)
+            m.do_move(delta_time)
             if m.is_alive:
                 self.hash_grid.insert(m.position, m.id)
+                if m.move_speed > max_speed:
+                    max_speed = m.move_speed
+        # do_move 把速度限制在 move_speed 以内，这是本帧任何单位位移的上界
+        self.motion += max_speed * delta_time * MOVE_SPEED_SCALE
+        # 有单位死亡或加入时才重建列表
+        if self.roster_changed:
+            self.monsters = [m for m in self.monsters if m.is_alive]
+            self.alive_monsters = list(self.monsters)
+            self.roster_changed = False
+            # 新单位从这里开始出现在 alive_monsters 中
+            for faction in self.spawned_factions:
+                self.invalidate_targets(faction)
+            self.spawned_factions.clear()
         # 检查胜利条件
-        self.alive_monsters = [m for m in self.monsters if m.is_alive]
+        if self.recorder is not None:
+            self.recorder.capture(self)
         winner = self.check_victory()
         if winner:
-            print(f"\nVictory for {winner.name}!")
-            left = len([m for m in self.alive_monsters if m.is_alive and m.faction == Faction.LEFT])
-            print(f"左边存活{left} / 右边存活{len(self.alive_monsters) - left}")
+            debug_print(f"\nVictory for {winner.name}!")
+            debug_print(f"左边存活{self.alive_count[Faction.LEFT]} / 右边存活{self.alive_count[Faction.RIGHT]}")
             return winner
+
+        draw = self.check_draw()
+        if draw:
+            debug_print(f"\nDraw by {draw.name} at {self.gameTime:.1f}s")
+            return draw
         
-        self.gameTime += VIRTUAL_TIME_DELTA
+        self.gameTime += delta_time
         return None
+
+    def advance_round(self):
+        self.round += 1
+        self.reference_steps = self.reference_frame(self.round) - self.reference_frame(self.round - 1)
+
+    def reference_frame(self, round):
+        """第 round 帧结束时对应的 30 帧/秒 参考帧"""
+        return int(round * VIRTUAL_TIME_STEP / self.time_step + 1e-9)
     
-    def run_battle(self, visualize=False):
-        """运行战斗直到决出胜负"""
-        while True:
-            if visualize and self.round % 30 == 0:
-                self.print_battlefield()
-                time.sleep(1)
-            
-            result = self.run_one_frame()
-            if result != None:
-                return result
+    def run_battle(self, visualize=False, renderer=None):
+        """运行战斗直到决出胜负，或者以超时/僵局平局结束"""
+        if visualize and renderer is None:
+            renderer = TerminalRenderer(self.map_size)
+        if renderer is not None:
+            renderer.start()
+        # 渲染线程用光标移动重画网格，直接打印的日志会打乱画面，改由渲染器显示在网格下方
+        redirect = redirect_debug_print(renderer.log) if renderer is not None else nullcontext()
+        try:
+            with redirect:
+                while True:
+                    # 渲染在独立线程中进行，跟不上时直接跳过这一帧
+                    if renderer is not None and renderer.wants_frame():
+                        renderer.submit(self.frame_snapshot())
+
+                    if self.accelerator is not None:
+                        self.accelerator.advance()
+                    result = self.run_one_frame()
+                    if result != None:
+                        if renderer is not None:
+                            renderer.submit(self.frame_snapshot())
+                        return result
+        finally:
+            if renderer is not None:
+                renderer.stop()
+
+    def frame_snapshot(self):
+        """给渲染器用的轻量快照：(回合, [(x, y, 阵营, 图标), ...])"""
+        return (self.round, [(m.position.x, m.position.y, m.faction, m.char_icon)
+                             for m in self.alive_monsters if m.is_alive])
+
+    def snapshot(self) -> BattleSnapshot:
+        """保存当前帧的完整战场状态"""
+        state = self._copy_to(Battlefield.__new__(Battlefield))
+        return BattleSnapshot(state, self.round, self.gameTime)
+
+    def restore(self, snapshot : BattleSnapshot):
+        """把战场恢复到快照时的状态，同一个快照可以反复恢复；记录器和快进保持不变"""
+        attachments = {name: getattr(self, name, None) for name in Battlefield.ATTACHMENTS}
+        self.__dict__.clear()
+        snapshot.state._copy_to(self)
+        self.__dict__.update(attachments)
+
+    def fork(self, seed=None) -> 'Battlefield':
+        """从当前帧分叉出一个独立的战场，使用新的随机种子继续模拟，不带记录器和快进"""
+        battlefield = self._copy_to(Battlefield.__new__(Battlefield))
+        battlefield.rng = random.Random(seed)
+        return battlefield
+
+    def _copy_to(self, target):
+        copy_battlefield(self, target, shared=(self.monster_data, self.damage_table), exclude=Battlefield.ATTACHMENTS)
+        for name in Battlefield.ATTACHMENTS:
+            setattr(target, name, None)
+        return target
 
     def danger_zone_size(self):
         if self.gameTime < 60:
@@ -0,0 +1,208 @@
+"""
+多精度级联评估
+
+成千上万个候选阵容里大部分一眼就能看出输赢，没必要都跑完整的多种子模拟。CascadeEvaluator 分三级：
+1. 模板估计：用 monsters.json 的攻击力、攻击间隔、生命值和伤害表估计双方击杀对方所需的时间，
+   两者的对数比足够大时直接给出结果；
+2. 粗模拟：低帧率（time_step=10）的 Battlefield 跑一个种子，胜方剩余血量比例足够大时给出结果；
+3. 完整模拟：30 帧、多个种子，取多数。
+每一级的阈值都可以配置。evaluate 返回结果和决定它的级别，stats 统计各级的数量和省下的工作量
+（按实际模拟的帧数和模拟耗时两种口径）；
+audit 模式会对提前决定的候选也跑一次完整模拟，统计与完整精度的不一致率。
+
+用法（在包的上一级目录）：
+    python -m arknight.cascade arknight/arknights53.csv --limit 200 --audit
+"""
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from .battle_field import Battlefield
+from .damage_table import damage_table_for
+from .utils import VIRTUAL_TIME_STEP, Faction, normalize_army
+
+ESTIMATE, COARSE, FULL = "estimate", "coarse", "full"
+
+
+class TemplateEstimator:
+    """只看模板数值的对局估计，忽略特性、射程和站位"""
+    def __init__(self, monster_data):
+        table = damage_table_for(monster_data)
+        self.index = {name: i for i, name in enumerate(table.names)}
+        interval = np.array([m["攻击间隔"]["数值"] for m in monster_data], dtype=np.float64)
+        self.health = np.array([m["生命值"]["数值"] for m in monster_data], dtype=np.float64)
+        # dps[i, j]：i 打 j 每秒的伤害
+        self.dps = table.matrix / interval[:, None]
+
+    def counts(self, army):
+        c = np.zeros(len(self.health))
+        for name, count in army.items():
+            c[self.index[name]] += count
+        return c
+
+    def kill_time(self, attackers, defenders):
+        """attackers 打光 defenders 的时间，伤害按 defenders 的血量比例分摊"""
+        hp = defenders * self.health
+        total = hp.sum()
+        dps = attackers @ self.dps @ (hp / total)
+        return total / dps if dps > 0 else math.inf
+
+    def margin(self, left_army, right_army):
+        """log(右边打光左边的时间 / 左边打光右边的时间)，大于 0 表示左边占优"""
+        if any(name not in self.index for name in list(left_army) + list(right_army)):
+            return 0.0
+        left, right = self.counts(left_army), self.counts(right_army)
+        return math.log(self.kill_time(right, left) / self.kill_time(left, right))
+
+
+class CascadeEvaluator:
+    def __init__(self, monster_data, estimate_margin=4.0, coarse_margin=0.35, coarse_time_step=10,
+                 full_seeds=3, seed=0, audit=False):
+        self.monster_data = monster_data
+        self.estimator = TemplateEstimator(monster_data)
+        self.health = {m["名字"]: m["生命值"]["数值"] for m in monster_data}
+        # 模板估计的对数比超过它时直接决定，设为 math.inf 表示跳过这一级。
+        # 估计忽略了特性，在 arknights53.csv 上对数比 2 以上也只有约 77% 与标签一致，所以默认很保守
+        self.estimate_margin = estimate_margin
+        # 粗模拟胜方剩余血量比例超过它时直接决定，设为 math.inf 表示跳过这一级
+        self.coarse_margin = coarse_margin
+        self.coarse_time_step = coarse_time_step
+        self.full_seeds = full_seeds
+        self.seed = seed
+        # 提前决定的候选也跑完整模拟，用来统计不一致率
+        self.audit = audit
+
+        self.decided = Counter()  # 级别 -> 决定的候选数
+        self.audited = Counter()  # 级别 -> 审计的候选数
+        self.disagreements = Counter()
+        # 决定结果实际花掉的模拟帧数和耗时，审计跑的完整模拟不算在内。
+        # 低帧率的一帧和 30 帧的一帧开销差不多，所以帧数不折算
+        self.frames = 0
+        self.elapsed = 0.0
+        # 完整模拟的帧数和耗时，用来估计所有候选都跑完整模拟时的工作量
+        self.full_frames = 0
+        self.full_elapsed = 0.0
+        self.full_runs = 0
+
+    def run(self, left_army, right_army, time_step, seed):
+        """跑一局，返回 (胜者, 左边剩余血量比例 - 右边剩余血量比例, 实际模拟的帧数, 耗时)"""
+        start = time.perf_counter()
+        battlefield = Battlefield(self.monster_data, seed=seed, time_step=time_step)
+        if not battlefield.setup_battle(left_army, right_army, self.monster_data):
+            raise ValueError(f"无法开始对局：{left_army} vs {right_army}")
+        winner = battlefield.run_battle()
+        remaining = {Faction.LEFT: 0.0, Faction.RIGHT: 0.0}
+        for m in battlefield.alive_monsters:
+            if m.is_alive:
+                remaining[m.faction] += max(0.0, m.health)
+        battlefield.release_summons()
+        left = remaining[Faction.LEFT] / self._total_health(left_army)
+        right = remaining[Faction.RIGHT] / self._total_health(right_army)
+        return winner, left - right, battlefield.round, time.perf_counter() - start
+
+    def _total_health(self, army):
+        return max(1.0, sum(self.health[name] * count for name, count in army.items()))
+
+    def full(self, left_army, right_army):
+        wins = 0
+        frames = 0
+        elapsed = 0.0
+        for s in range(self.full_seeds):
+            winner, _, n, t = self.run(left_army, right_army, VIRTUAL_TIME_STEP, self.seed + s)
+            wins += winner == Faction.LEFT
+            frames += n
+            elapsed += t
+        self.full_runs += 1
+        self.full_frames += frames
+        self.full_elapsed += elapsed
+        return wins * 2 > self.full_seeds, frames, elapsed
+
+    def evaluate(self, left_army, right_army):
+        """返回 (左边是否获胜, 决定结果的级别, 这一级的差距)"""
+        left_army = normalize_army(left_army)
+        right_army = normalize_army(right_army)
+
+        stage, margin = ESTIMATE, self.estimator.margin(left_army, right_army)
+        if abs(margin) < self.estimate_margin:
+            stage = COARSE
+            winner, margin, frames, elapsed = self.run(left_army, right_army, self.coarse_time_step, self.seed)
+            self.frames += frames
+            self.elapsed += elapsed
+            if winner not in (Faction.LEFT, Faction.RIGHT):
+                margin = 0.0
+            if abs(margin) < self.coarse_margin:
+                stage = FULL
+                left_win, frames, elapsed = self.full(left_army, right_army)
+                self.frames += frames
+                self.elapsed += elapsed
+                self.decided[FULL] += 1
+                return left_win, FULL, margin
+        self.decided[stage] += 1
+        left_win = margin > 0
+        if self.audit:
+            reference, _, _ = self.full(left_army, right_army)
+            self.audited[stage] += 1
+            self.disagreements[stage] += reference != left_win
+        return left_win, stage, margin
+
+    def sweep(self, armies, opponent):
+        """把每个候选阵容放在左边和 opponent 对局"""
+        return [self.evaluate(army, opponent) for army in armies]
+
+    def stats(self):
+        evaluated = sum(self.decided.values())
+        # 没有跑过完整模拟的候选按完整模拟的平均帧数估计
+        runs = max(self.full_runs, 1)
+        baseline = self.full_frames / runs * evaluated
+        baseline_time = self.full_elapsed / runs * evaluated
+        return {
+            "evaluated": evaluated,
+            "decided": dict(self.decided),
+            "work_avoided": 1 - self.frames / baseline if baseline else 0.0,
+            "time_avoided": 1 - self.elapsed / baseline_time if baseline_time else 0.0,
+            "audited": sum(self.audited.values()),
+            "disagreement_rate": sum(self.disagreements.values()) / max(sum(self.audited.values()), 1),
+            "disagreement_by_stage": {k: self.disagreements[k] / n for k, n in self.audited.items()},
+        }
+
+
+def main(argv=None):
+    from . import simulate, utils
+
+    parser = argparse.ArgumentParser(description="在数据集上运行多精度级联评估")
+    parser.add_argument("csv", help="对局数据集")
+    parser.add_argument("--limit", type=int, default=200, help="只使用前多少个对局")
+    parser.add_argument("--estimate-margin", type=float, default=4.0, help="模板估计直接决定所需的对数比")
+    parser.add_argument("--coarse-margin", type=float, default=0.35, help="粗模拟直接决定所需的剩余血量比例差")
+    parser.add_argument("--coarse-fps", type=int, default=10, help="粗模拟的帧率")
+    parser.add_argument("--seeds", type=int, default=3, help="完整模拟的种子数")
+    parser.add_argument("--audit", action="store_true", help="提前决定的候选也跑完整模拟，统计不一致率")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data(args.monsters)
+    scenes = simulate.process_battle_data(args.csv)[:args.limit]
+    evaluator = CascadeEvaluator(monster_data, args.estimate_margin, args.coarse_margin, args.coarse_fps,
+                                 args.seeds, audit=args.audit)
+    correct = 0
+    start = time.perf_counter()
+    for scene in scenes:
+        left_win, _, _ = evaluator.evaluate(scene["left"], scene["right"])
+        correct += left_win == (scene["result"] == "left")
+    elapsed = time.perf_counter() - start
+
+    s = evaluator.stats()
+    print(f"对局 {s['evaluated']}，各级决定：{s['decided']}，与标签一致 {correct / max(len(scenes), 1):.1%}")
+    print(f"省下的模拟工作量：帧数 {s['work_avoided']:.1%}，模拟耗时 {s['time_avoided']:.1%}；总耗时 {elapsed:.1f}s")
+    if args.audit:
+        by_stage = "，".join(f"{k} {v:.1%}" for k, v in s["disagreement_by_stage"].items())
+        print(f"提前决定 {s['audited']} 个，与完整模拟不一致 {s['disagreement_rate']:.1%}（{by_stage}）")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
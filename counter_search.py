@@ -0,0 +1,229 @@
+"""
+克制阵容搜索
+
+给定对面的阵容（例如 scene.json 的右边），寻找以至少目标概率打赢它的最便宜的左边阵容。
+在 MONSTER_MAPPING 的怪物种类和数量上做束搜索：
+- 每个候选先跑少量对局，Wilson 置信区间上界达不到目标的直接剪枝，存活的候选再追加对局；
+- 结果按规范化对局缓存，相同阵容不会重复模拟；
+- 候选在进程池中并行评估，所有候选使用同一组随机种子（共同随机数），比较更稳定。
+
+用法（在包的上一级目录）：
+    python -m arknight.counter_search arknight/scene.json --side right --target 0.8 --workers 4
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+
+from . import server, simulate, utils
+from .utils import MONSTER_MAPPING, canonical_matchup, normalize_army, wilson_interval
+
+# 逐级追加的对局数，每一级之后做一次剪枝
+TRIAL_SCHEDULE = (4, 12, 32)
+
+
+class CandidateEvaluator:
+    """带缓存的并行候选评估"""
+    def __init__(self, opponent, monster_path=simulate.MONSTER_DATA_PATH, workers=None, seed=0):
+        self.opponent = opponent
+        self.seed = seed
+        self.results = {}  # 规范化对局 -> [胜场, 局数]
+        self.battles = 0
+        if workers == 0:
+            server._init_worker(monster_path)
+            self.pool = None
+        else:
+            self.pool = multiprocessing.Pool(workers, initializer=server._init_worker, initargs=(monster_path,))
+
+    def stats(self, army):
+        return self.results.get(canonical_matchup(army, self.opponent), [0, 0])
+
+    def evaluate(self, armies, trials):
+        """把每个阵容的对局数补到 trials 局"""
+        jobs = []
+        queued = set()
+        for army in armies:
+            key = canonical_matchup(army, self.opponent)
+            done = self.results.setdefault(key, [0, 0])[1]
+            if done < trials and key not in queued:
+                queued.add(key)
+                jobs.append((key, army, trials - done))
+
+        args = [(army, self.opponent, n, self.seed + self.results[key][1]) for key, army, n in jobs]
+        if self.pool is None:
+            outputs = [server.simulate_request(*a) for a in args]
+        else:
+            outputs = self.pool.starmap(server.simulate_request, args)
+
+        for (key, _, n), output in zip(jobs, outputs):
+            record = self.results[key]
+            if "error" in output:
+                record[1] = math.inf
+                continue
+            record[0] += output["winners"].count("LEFT")
+            record[1] += n
+            self.battles += n
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+class CounterSearch:
+    def __init__(self, opponent, monster_data, evaluator, target=0.8, beam_width=8, max_units=40,
+                 max_types=3, costs=None, candidates=None):
+        self.opponent = opponent
+        self.evaluator = evaluator
+        self.target = target
+        self.beam_width = beam_width
+        self.max_units = max_units
+        self.max_types = max_types
+        self.costs = costs or {}
+
+        templates = {m["名字"]: m for m in monster_data}
+        names = candidates or [name for name in MONSTER_MAPPING.values() if name in templates]
+        self.templates = {name: templates[name] for name in names}
+
+    def cost(self, army):
+        return sum(count * self.costs.get(name, 1) for name, count in army.items())
+
+    def initial_count(self, name):
+        """让总血量和对面相当的数量"""
+        opponent_hp = sum(self.templates.get(n, {"生命值": {"数值": 0}})["生命值"]["数值"] * c
+                          for n, c in self.opponent.items())
+        hp = self.templates[name]["生命值"]["数值"]
+        return int(min(self.max_units, max(1, math.ceil(opponent_hp / hp))))
+
+    def win_rate(self, army):
+        wins, trials = self.evaluator.stats(army)
+        return wins / trials if trials and trials != math.inf else 0.0
+
+    def passed(self, army):
+        wins, trials = self.evaluator.stats(army)
+        return trials != math.inf and trials >= TRIAL_SCHEDULE[-1] and wins / trials >= self.target
+
+    def screen(self, armies):
+        """逐级追加对局并剪枝，返回没有被剪掉的阵容"""
+        alive = armies
+        for trials in TRIAL_SCHEDULE:
+            self.evaluator.evaluate(alive, trials)
+            survivors = []
+            for army in alive:
+                wins, done = self.evaluator.stats(army)
+                if done != math.inf and wilson_interval(wins, done)[1] >= self.target:
+                    survivors.append(army)
+            alive = survivors
+        return alive
+
+    def neighbours(self, army, seeds):
+        """候选的邻居：调整已有种类的数量，或者加入一个新种类"""
+        result = []
+        total = sum(army.values())
+        for name, count in army.items():
+            step = max(1, count // 5)
+            if total + step <= self.max_units:
+                result.append({**army, name: count + step})
+            if count - step > 0:
+                result.append({**army, name: count - step})
+            elif len(army) > 1:
+                result.append({n: c for n, c in army.items() if n != name})
+        if len(army) < self.max_types:
+            for name in seeds:
+                if name in army:
+                    continue
+                count = max(1, self.initial_count(name) // 2)
+                if total + count <= self.max_units:
+                    result.append({**army, name: count})
+        return result
+
+    def rank_key(self, army):
+        # 达标的按成本从低到高，没达标的按胜率从高到低
+        if self.passed(army):
+            return (0, self.cost(army), -self.win_rate(army))
+        return (1, -self.win_rate(army), self.cost(army))
+
+    def run(self, rounds=6):
+        singles = [{name: self.initial_count(name)} for name in self.templates]
+        self.screen(singles)
+        singles.sort(key=self.rank_key)
+        # 单兵种表现最好的几种作为加入新种类时的候选
+        seeds = [next(iter(army)) for army in singles[:self.beam_width]]
+
+        seen = {canonical_matchup(army, {}) for army in singles}
+        beam = singles[:self.beam_width]
+        for _ in range(rounds):
+            expansions = []
+            for army in beam:
+                for candidate in self.neighbours(army, seeds):
+                    key = canonical_matchup(candidate, {})
+                    if key not in seen:
+                        seen.add(key)
+                        expansions.append(candidate)
+            if not expansions:
+                break
+            self.screen(expansions)
+            beam = sorted(beam + expansions, key=self.rank_key)[:self.beam_width]
+
+        return self.report()
+
+    def report(self):
+        """所有达标阵容，按成本和置信下界排序"""
+        rows = []
+        for key, (wins, trials) in self.evaluator.results.items():
+            if trials == math.inf or trials < TRIAL_SCHEDULE[-1]:
+                continue
+            left = dict(json.loads(key)[0])
+            if wins / trials < self.target:
+                continue
+            low, high = wilson_interval(wins, trials)
+            rows.append({"army": left, "cost": self.cost(left), "win_rate": wins / trials,
+                         "interval": (low, high), "trials": trials})
+        rows.sort(key=lambda r: (r["cost"], -r["interval"][0]))
+        return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="搜索打赢指定阵容的最便宜阵容")
+    parser.add_argument("scene", help="包含对面阵容的 scene.json")
+    parser.add_argument("--side", default="right", choices=["left", "right"], help="对面阵容在文件中的哪一边")
+    parser.add_argument("--target", type=float, default=0.8, help="目标胜率")
+    parser.add_argument("--beam", type=int, default=8, help="束宽")
+    parser.add_argument("--rounds", type=int, default=6, help="扩展轮数")
+    parser.add_argument("--max-units", type=int, default=40, help="阵容最多的单位数")
+    parser.add_argument("--max-types", type=int, default=3, help="阵容最多的种类数")
+    parser.add_argument("--costs", help="每种怪物的成本（JSON 文件，默认每个单位成本为1）")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，0 表示在主进程中模拟")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    with open(args.scene, encoding='utf-8') as f:
+        opponent = normalize_army(json.load(f)[args.side])
+    costs = None
+    if args.costs:
+        with open(args.costs, encoding='utf-8') as f:
+            costs = json.load(f)
+
+    monster_data = simulate.load_monster_data()
+    evaluator = CandidateEvaluator(opponent, workers=args.workers, seed=args.seed)
+    try:
+        search = CounterSearch(opponent, monster_data, evaluator, target=args.target, beam_width=args.beam,
+                               max_units=args.max_units, max_types=args.max_types, costs=costs)
+        rows = search.run(args.rounds)
+    finally:
+        evaluator.close()
+
+    print(f"对面阵容：{opponent}，共模拟 {evaluator.battles} 局")
+    if not rows:
+        print(f"没有找到胜率达到 {args.target:.0%} 的阵容")
+    for i, row in enumerate(rows[:args.top]):
+        low, high = row["interval"]
+        print(f"{i + 1:>2}. 成本 {row['cost']:<5} 胜率 {row['win_rate']:.2%} [{low:.2%}, {high:.2%}]"
+              f" ({row['trials']}局)  {row['army']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
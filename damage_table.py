@@ -0,0 +1,81 @@
+"""
+模板两两之间的单次伤害表
+
+Monster.calculate_damage 每次命中都要用攻击力、防御和法抗重新计算伤害，但绝大多数单位的这些数值
+从来不会改变（只有 AcidSlug、鳄鱼、雪境精锐 等少数怪物会减防减抗）。
+这里对每一对 (攻击方模板, 受击方模板) 预先算好基础单次伤害，双方数值都没有被修改过（stats_dirty 为 False）时直接查表，
+否则回退到实时计算。
+
+导出伤害表（在包的上一级目录）：
+    python -m arknight.damage_table damage_table.csv
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from .utils import DamageType
+
+# id(monster_data) -> (monster_data, DamageTable)，同一份模板只建一次表
+_tables = {}
+
+
+class DamageTable:
+    def __init__(self, monster_data):
+        self.names = [m["名字"] for m in monster_data]
+        self._templates = {id(m): i for i, m in enumerate(monster_data)}
+
+        attack = np.array([m["攻击力"]["数值"] for m in monster_data], dtype=np.float64)
+        physical = np.array([m["类型"] == "物理" for m in monster_data])
+        defense = np.array([m["物理防御"]["数值"] for m in monster_data], dtype=np.float64)
+        resist = np.array([m["法抗"]["数值"] for m in monster_data], dtype=np.float64)
+
+        # 与 calculate_normal_dmg 的公式相同，行是攻击方，列是受击方
+        atk = attack[:, None]
+        physical_dmg = np.maximum(atk - defense[None, :], atk * 0.05)
+        magic_dmg = np.maximum(atk * 0.05, atk * (1.0 - resist[None, :] / 100))
+        self.matrix = np.where(physical[:, None], physical_dmg, magic_dmg)
+        self.attack_types = [DamageType.PHYSICAL if p else DamageType.MAGIC for p in physical]
+        # 查表走 Python 列表比 NumPy 标量索引快
+        self.rows = self.matrix.tolist()
+
+    def index_of(self, data):
+        """模板在表中的行号，不是来自这份模板数据时返回 -1"""
+        return self._templates.get(id(data), -1)
+
+    def lookup(self, attacker_index, target_index):
+        return self.rows[attacker_index][target_index]
+
+    def export(self, path):
+        """导出为 CSV，行是攻击方，列是受击方"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["攻击方\\受击方"] + self.names)
+            for name, row in zip(self.names, self.rows):
+                writer.writerow([name] + [round(v, 3) for v in row])
+
+
+def damage_table_for(monster_data):
+    entry = _tables.get(id(monster_data))
+    if entry is None or entry[0] is not monster_data:
+        entry = (monster_data, DamageTable(monster_data))
+        _tables[id(monster_data)] = entry
+    return entry[1]
+
+
+def main(argv=None):
+    from . import simulate
+
+    parser = argparse.ArgumentParser(description="导出模板两两之间的单次伤害表")
+    parser.add_argument("out", help="输出的 CSV 文件")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    args = parser.parse_args(argv)
+
+    table = damage_table_for(simulate.load_monster_data(args.monsters))
+    table.export(args.out)
+    print(f"已导出 {len(table.names)}x{len(table.names)} 的伤害表到 {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
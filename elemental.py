@@ -14,6 +14,13 @@ class ElementAccumulator:
         self.burst_queue = []  # 爆条优先级队列
         self.owner = owner
 
+    def reset(self):
+        """对象池复用时原地清空"""
+        for et in self.accumulators:
+            self.accumulators[et] = 0.0
+        self.active_burst = None
+        self.burst_queue.clear()
+
     def accumulate(self, element: ElementType, value: float):
         """累积元素损伤"""
         if self.active_burst:
@@ -0,0 +1,303 @@
+"""
+接敌前快进
+
+每场战斗开始时双方都在地图两侧 0.5 宽的区域出生，要走过 13 格宽的地图才会接敌，
+这几百帧里每一帧都在做寻敌、碰撞和移动。ApproachFastForward 在没有任何单位处于敌人的
+攻击/技能范围内、也没有计时中的东西（射弹、buff、元素爆发、毒圈）时，用 NumPy 按子步批量推进位置，
+在双方接触之前把控制权交回正常的逐帧循环。
+
+快进期间每一帧仍然会调用各单位的 on_extra_update 和 increase_skill_cd，计时器与逐帧模拟一致；
+这些逻辑一旦改变了可观察的状态（移速、射程、攻击状态、新单位、射弹等）就立即停止快进。
+位置在子步内按闭式解推进，碰撞用重叠松弛近似，所以结果与逐帧模拟在统计上一致，而不是逐位相同。
+
+用法：
+    battlefield.accelerator = ApproachFastForward(battlefield)
+    battlefield.run_battle()
+
+等价性检查（在包的上一级目录）：每个对局用多个种子分别逐帧和快进地跑，比较胜负、结束帧和剩余生命值，
+胜负一致率低于 --min-agree 时返回非零退出码
+    python -m arknight.fast_forward arknight/arknights53.csv --limit 50 --seeds 5
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+from .battle_field import SPAWN_PAUSE, Battlefield
+from .monsters import AttackState, Monster
+from .utils import MOVE_SPEED_SCALE, VIRTUAL_TIME_STEP, Faction
+from .zone import PoisonZone
+
+# 子类改写这些方法后，单位在接敌前的行为就不再是“寻敌 + 移动 + 攻击计时”，不能批量推进
+_PER_FRAME_METHODS = ("update", "move_toward_enemy", "do_move", "can_attack", "find_target",
+                      "search_target", "increase_attack_cd", "update_elemental")
+# 毒圈在这个时间开始收缩
+POISON_START_TIME = 60
+
+_class_ok = {}
+
+
+def _class_supported(cls):
+    ok = _class_ok.get(cls)
+    if ok is None:
+        ok = all(getattr(cls, name) is getattr(Monster, name) for name in _PER_FRAME_METHODS)
+        _class_ok[cls] = ok
+    return ok
+
+
+def _contact_radius(m):
+    """敌人进入这个距离后，攻击或者距离触发器就可能发生"""
+    radius = m.attack_range
+    for trigger in m.triggers:
+        if trigger.target_mode == "leave":
+            # 目标离开范围时触发的逻辑在接敌前每一帧都会触发
+            return None
+        radius = max(radius, trigger.get_radius())
+    return radius
+
+
+def _signature(battlefield, units):
+    """快进期间不允许改变的状态"""
+    return (battlefield.globalId, len(battlefield.projectiles_manager.projectiles), len(battlefield.effect_zones),
+            len(battlefield.triggers), tuple(
+                (m.is_alive, m.can_target, m.move_speed, m.attack_range, m.attack_state, m.frozen, m.dizzy,
+                 m.aggro, len(m.status_system.effects), m.element_system.active_burst is None)
+                for m in units))
+
+
+class ApproachFastForward:
+    def __init__(self, battlefield, max_substep=6, guard_frames=4):
+        self.battlefield = battlefield
+        # 子步长度（帧），每个子步开始时重新选择移动方向
+        self.max_substep = max_substep
+        # 预计接触前至少留这么多帧给正常循环
+        self.guard_frames = guard_frames
+        # 已经有单位接敌，之后不会再进入快进
+        self.finished = False
+        self.activations = 0
+        self.substeps = 0
+        self.frames_skipped = 0
+
+    def eligible(self, units):
+        battlefield = self.battlefield
+        if self.finished or not units or battlefield.projectiles_manager.projectiles:
+            return False
+        if battlefield.gameTime >= POISON_START_TIME or any(not isinstance(z, PoisonZone) for z in battlefield.effect_zones):
+            return False
+        for m in units:
+            if (not m.is_alive or not m.can_target or m.frozen or m.dizzy or m.attack_state != AttackState.等待
+                    or m.status_system.effects or m.element_system.active_burst is not None
+                    or not _class_supported(type(m))):
+                return False
+        return True
+
+    def _frame_limit(self):
+        """不改变出怪、毒圈和平局判定的前提下最多可以快进的帧数"""
+        battlefield = self.battlefield
+        delta_time = battlefield.delta_time
+        limits = [int((POISON_START_TIME - battlefield.gameTime) / delta_time) - 1]
+        if (battlefield.current_spawn_left < len(battlefield.monster_temporal_area_left)
+                or battlefield.current_spawn_right < len(battlefield.monster_temporal_area_right)):
+            # 还有怪没出，只能快进出怪暂停的那段参考帧
+            if not SPAWN_PAUSE[0] <= battlefield.reference_frame(battlefield.round + 1) <= SPAWN_PAUSE[1]:
+                return 0
+            last = int((SPAWN_PAUSE[1] + 1) * battlefield.time_step / VIRTUAL_TIME_STEP - 1e-9)
+            limits.append(last - battlefield.round)
+        if battlefield.max_game_time is not None:
+            limits.append(int((battlefield.max_game_time - battlefield.gameTime) / delta_time) - 1)
+        if battlefield.stalemate_time is not None:
+            idle = battlefield.gameTime - battlefield.last_health_change_time
+            limits.append(int((battlefield.stalemate_time - idle) / delta_time) - 1)
+        return max(0, min(limits))
+
+    def advance(self):
+        """在下一帧开始之前调用，返回快进的帧数"""
+        battlefield = self.battlefield
+        units = [m for m in battlefield.alive_monsters if m.is_alive]
+        if not self.eligible(units):
+            return 0
+        radius = [_contact_radius(m) for m in units]
+        if None in radius:
+            return 0
+        left = np.array([m.faction == Faction.LEFT for m in units])
+        if left.all() or not left.any():
+            return 0
+        limit = self._frame_limit()
+        if limit <= 0:
+            return 0
+
+        pos = np.array([(m.position.x, m.position.y) for m in units], dtype=np.float64)
+        vel = np.array([(m.velocity.x, m.velocity.y) for m in units], dtype=np.float64)
+        speed = np.array([m.move_speed for m in units], dtype=np.float64)
+        radius = np.array(radius, dtype=np.float64)
+        enemy = left[:, None] != left[None, :]
+        # 两个单位都朝对方全速移动时每帧最多靠近的距离
+        delta_time = battlefield.delta_time
+        blend = battlefield.velocity_blend
+        closing = (speed[:, None] + speed[None, :]) * delta_time * MOVE_SPEED_SCALE
+        reach = np.maximum(radius[:, None], radius[None, :]) + 2 * battlefield.HIT_BOX_RADIUS
+        map_size = np.array(battlefield.map_size, dtype=np.float64)
+
+        signature = _signature(battlefield, units)
+        advanced = 0
+        changed = False
+        while advanced < limit and not changed:
+            diff = pos[None, :, :] - pos[:, None, :]
+            dist = np.sqrt((diff ** 2).sum(axis=2))
+            gap = np.where(enemy, dist - reach, np.inf)
+            if (np.where(enemy, dist, np.inf) <= radius[:, None]).any():
+                # 已经接敌
+                self.finished = True
+                break
+            with np.errstate(divide='ignore'):
+                safe = np.where(enemy, gap / np.maximum(closing, 1e-12), np.inf).min()
+            n = min(int(safe) - self.guard_frames, self.max_substep, limit - advanced)
+            if n <= 0:
+                break
+
+            for i in range(n):
+                battlefield.advance_round()
+                for m in units:
+                    m.frame_counter += 1
+                    m.on_extra_update(delta_time)
+                    m.increase_skill_cd(delta_time)
+                    m.increase_attack_cd(delta_time)
+                battlefield.motion += speed.max() * delta_time * MOVE_SPEED_SCALE
+                battlefield.check_draw()
+                battlefield.gameTime += delta_time
+                if _signature(battlefield, units) != signature:
+                    # 这一帧的技能逻辑改变了战场，剩下的交给逐帧循环
+                    n = i + 1
+                    changed = True
+                    break
+
+            # 每个单位朝最近的敌人移动，子步内方向不变：v_k = a^k v + (1 - a^k) u，位移是 v_1..v_n 之和
+            nearest = np.where(enemy, dist, np.inf).argmin(axis=1)
+            direction = pos[nearest] - pos
+            direction /= np.maximum(np.linalg.norm(direction, axis=1), 1e-12)[:, None]
+            u = direction * speed[:, None]
+            length = np.linalg.norm(vel, axis=1)
+            vel *= np.minimum(1.0, speed / np.maximum(length, 1e-12))[:, None]
+            decay = blend ** n
+            total = blend * (1 - decay) / (1 - blend)
+            pos += (vel * total + u * (n - total)) * delta_time * MOVE_SPEED_SCALE
+            vel = vel * decay + u * (1 - decay)
+            self._relax(pos, left, battlefield.HIT_BOX_RADIUS)
+            np.clip(pos, 0, map_size, out=pos)
+            advanced += n
+            self.substeps += 1
+
+        if advanced == 0:
+            return 0
+        for m, (x, y), (vx, vy) in zip(units, pos.tolist(), vel.tolist()):
+            m.position.x = x
+            m.position.y = y
+            m.velocity = type(m.velocity)(vx, vy)
+            m.target_cache = None
+            battlefield.hash_grid.insert(m.position, m.id)
+        battlefield.lane_index.invalidate()
+        for m in units:
+            m.target = m.find_target()
+        self.activations += 1
+        self.frames_skipped += advanced
+        return advanced
+
+    @staticmethod
+    def _relax(pos, left, hit_radius):
+        """同阵营单位重叠时沿连线各退一半，近似逐帧的碰撞挤出"""
+        diff = pos[None, :, :] - pos[:, None, :]
+        dist = np.sqrt((diff ** 2).sum(axis=2))
+        overlap = (left[:, None] == left[None, :]) & (dist < 2 * hit_radius)
+        np.fill_diagonal(overlap, False)
+        if not overlap.any():
+            return
+        depth = np.where(overlap, 2 * hit_radius - dist, 0.0)
+        unit = diff / np.maximum(dist, 1e-4)[:, :, None]
+        pos -= (unit * (depth / 2)[:, :, None]).sum(axis=1)
+
+
+def remaining_health(battlefield):
+    """(左边剩余生命值, 右边剩余生命值)"""
+    health = [0.0, 0.0]
+    for m in battlefield.alive_monsters:
+        if m.is_alive:
+            health[m.faction.value] += m.health
+    return tuple(health)
+
+
+def _run(monster_data, scene, seed, fast, **kwargs):
+    battlefield = Battlefield(monster_data, seed=seed)
+    if not battlefield.setup_battle(scene["left"], scene["right"], monster_data):
+        return None
+    if fast:
+        battlefield.accelerator = ApproachFastForward(battlefield, **kwargs)
+    start = time.perf_counter()
+    winner = battlefield.run_battle()
+    elapsed = time.perf_counter() - start
+    skipped = battlefield.accelerator.frames_skipped if fast else 0
+    return winner, battlefield.round, remaining_health(battlefield), elapsed, skipped
+
+
+def check_equivalence(monster_data, scenes, seeds=1, **kwargs):
+    """用相同的种子分别逐帧和快进地跑每个对局，比较胜负、结束帧和双方剩余生命值"""
+    report = {"battles": 0, "agree": 0, "frames": 0, "frames_skipped": 0, "time_full": 0.0, "time_fast": 0.0,
+              "left_wins_full": 0, "left_wins_fast": 0, "only_full_left": 0, "only_fast_left": 0,
+              "round_diff": 0, "health_full": 0.0, "health_diff": 0.0}
+    for i, scene in enumerate(scenes):
+        for s in range(seeds):
+            seed = i * seeds + s
+            full = _run(monster_data, scene, seed, False)
+            fast = _run(monster_data, scene, seed, True, **kwargs)
+            if full is None or fast is None:
+                continue
+            (winner, rounds, health, elapsed, _), (fast_winner, fast_rounds, fast_health, fast_elapsed, skipped) = full, fast
+            report["battles"] += 1
+            report["agree"] += winner == fast_winner
+            report["left_wins_full"] += winner == Faction.LEFT
+            report["left_wins_fast"] += fast_winner == Faction.LEFT
+            report["only_full_left"] += winner == Faction.LEFT and fast_winner != Faction.LEFT
+            report["only_fast_left"] += fast_winner == Faction.LEFT and winner != Faction.LEFT
+            report["round_diff"] += abs(fast_rounds - rounds)
+            report["health_full"] += sum(health)
+            report["health_diff"] += sum(abs(a - b) for a, b in zip(health, fast_health))
+            report["frames"] += rounds
+            report["frames_skipped"] += skipped
+            report["time_full"] += elapsed
+            report["time_fast"] += fast_elapsed
+    return report
+
+
+def main(argv=None):
+    from . import simulate, utils
+
+    parser = argparse.ArgumentParser(description="比较接敌前快进与逐帧模拟的结果")
+    parser.add_argument("csv", help="对局数据集")
+    parser.add_argument("--limit", type=int, default=50, help="只使用前多少个对局")
+    parser.add_argument("--seeds", type=int, default=5, help="每个对局使用的种子数")
+    parser.add_argument("--max-substep", type=int, default=6)
+    parser.add_argument("--min-agree", type=float, default=0.9, help="胜负一致率低于这个值时返回非零退出码")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scenes = simulate.process_battle_data(args.csv)[:args.limit]
+    r = check_equivalence(monster_data, scenes, args.seeds, max_substep=args.max_substep)
+    n = max(r["battles"], 1)
+    # 配对的左胜率差的标准误，只有一边左胜的对局携带差异信息
+    discordant = r["only_full_left"] + r["only_fast_left"]
+    diff = (r["left_wins_fast"] - r["left_wins_full"]) / n
+    se = math.sqrt(max(discordant / n - diff ** 2, 0.0) / n)
+    print(f"对局 {r['battles']}（{len(scenes)} 个阵容 x {args.seeds} 个种子），胜负一致 {r['agree']} ({r['agree'] / n:.1%})")
+    print(f"左边胜率 逐帧 {r['left_wins_full'] / n:.1%} / 快进 {r['left_wins_fast'] / n:.1%}，差 {diff:+.1%} ± {se:.1%}")
+    print(f"结束帧平均相差 {r['round_diff'] / n:.1f} 帧（逐帧平均 {r['frames'] / n:.0f} 帧），"
+          f"剩余生命值平均相差 {r['health_diff'] / max(r['health_full'], 1e-9):.1%}")
+    print(f"快进跳过 {r['frames_skipped']} / {r['frames']} 帧，耗时 {r['time_full']:.1f}s -> {r['time_fast']:.1f}s")
+    if r["agree"] < args.min_agree * r["battles"]:
+        print(f"胜负一致率低于 {args.min_agree:.0%}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+增量重新评估
+
+改了一个怪物的数值（monsters.json）或者一个子类（monsters.py）之后，只需要重新模拟包含它的对局。
+这里为数据集建立 怪物名 -> 行号 的倒排索引，并给每个怪物计算模板数据和类源码的指纹，
+和上一次保存的指纹对比，只重跑参与者有变化的行，其余行直接复用保存的结果。
+
+用法（在包的上一级目录）：
+    python -m arknight.incremental arknight/56fin2_66k.csv --store arknight/incremental_store.json
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+import types
+from collections import defaultdict
+
+from . import battle_field, simulate, utils
+from .monsters import Monster, MonsterFactory
+from .reporter import EvaluationReporter
+from .utils import canonical_matchup
+
+STORE_VERSION = 1
+
+# 召唤物：类源码里通过 append_monster_name 生成的怪物
+_SUMMON_PATTERN = re.compile(r'append_monster_name\(\s*"([^"]+)"')
+
+
+def _hash(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def engine_modules():
+    """Battlefield（以及可选的接敌前快进）直接或间接用到的本包模块，按模块名排序"""
+    from . import fast_forward
+
+    package = __package__ + "."
+    found = {}
+    pending = [battle_field, fast_forward]
+    while pending:
+        module = pending.pop()
+        if module.__name__ in found:
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                name = value.__name__
+            else:
+                name = getattr(value, "__module__", None)
+            if isinstance(name, str) and name.startswith(package) and name not in found and name in sys.modules:
+                pending.append(sys.modules[name])
+    return [found[name] for name in sorted(found)]
+
+
+def _engine_source(module):
+    source = inspect.getsource(module)
+    if module.__name__ == Monster.__module__:
+        # 注册过的怪物子类已经计入各自怪物的指纹，这里去掉它们，只保留模块级代码和共享的基类
+        for cls in set(MonsterFactory._monster_classes.values()):
+            if cls is not Monster:
+                source = source.replace(inspect.getsource(cls), f"<{cls.__name__}>")
+    return source
+
+
+def engine_fingerprint():
+    """所有怪物共享的引擎代码的指纹，变化时需要全部重跑"""
+    sources = [_engine_source(module) for module in engine_modules()]
+    sources.append(inspect.getsource(simulate.predict_left_win))
+    return _hash(*sources)
+
+
+def monster_class(name):
+    return MonsterFactory._monster_classes.get(name, Monster)
+
+
+def monster_fingerprints(monster_data):
+    """每个怪物的模板数据 + 子类源码的指纹"""
+    fingerprints = {}
+    for data in monster_data:
+        cls = monster_class(data["名字"])
+        source = inspect.getsource(cls) if cls is not Monster else ""
+        fingerprints[data["名字"]] = _hash(json.dumps(data, ensure_ascii=False, sort_keys=True), source)
+    return fingerprints
+
+
+def summon_dependencies(name):
+    """怪物会召唤出的其他怪物（递归）"""
+    result = set()
+    pending = [name]
+    while pending:
+        cls = monster_class(pending.pop())
+        if cls is Monster:
+            continue
+        for summon in _SUMMON_PATTERN.findall(inspect.getsource(cls)):
+            if summon not in result:
+                result.add(summon)
+                pending.append(summon)
+    return result
+
+
+def build_index(battle_data):
+    """倒排索引：怪物名 -> 包含它（或它的召唤物）的行号列表"""
+    index = defaultdict(list)
+    dependencies = {}
+    for row, scene_config in enumerate(battle_data):
+        names = set(scene_config["left"]) | set(scene_config["right"])
+        participants = set(names)
+        for name in names:
+            if name not in dependencies:
+                dependencies[name] = summon_dependencies(name)
+            participants |= dependencies[name]
+        for name in participants:
+            index[name].append(row)
+    return index
+
+
+def load_store(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        store = json.load(f)
+    if store.get("version") != STORE_VERSION:
+        return None
+    return store
+
+
+def save_store(path, store):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, encoding='utf-8', mode='w') as f:
+        json.dump(store, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def rows_to_simulate(battle_data, index, store, engine, fingerprints):
+    """找出需要重新模拟的行"""
+    if store is None or store["engine"] != engine:
+        return set(range(len(battle_data))), None
+
+    changed = {name for name, fp in fingerprints.items() if store["monsters"].get(name) != fp}
+    changed |= set(store["monsters"]) - set(fingerprints)
+    rows = set()
+    for name in changed:
+        rows.update(index.get(name, ()))
+
+    # 之前没有保存过结果的对局也要跑
+    outcomes = store["outcomes"]
+    for row, scene_config in enumerate(battle_data):
+        if canonical_matchup(scene_config["left"], scene_config["right"]) not in outcomes:
+            rows.add(row)
+    return rows, changed
+
+
+def reevaluate(battle_data, monster_data, store_path, reporter=None):
+    """增量评估整个数据集，返回 (报告器, 重新模拟的行数)"""
+    engine = engine_fingerprint()
+    fingerprints = monster_fingerprints(monster_data)
+    index = build_index(battle_data)
+    store = load_store(store_path)
+
+    rows, changed = rows_to_simulate(battle_data, index, store, engine, fingerprints)
+    if changed is None:
+        print(f"引擎代码或存档版本变化，需要重新模拟全部 {len(battle_data)} 行")
+    else:
+        print(f"变化的怪物：{', '.join(sorted(changed)) or '无'}，需要重新模拟 {len(rows)} / {len(battle_data)} 行")
+
+    old_outcomes = store["outcomes"] if store is not None and changed is not None else {}
+    outcomes = {}
+    reporter = reporter or EvaluationReporter(total=len(battle_data))
+    for row, scene_config in enumerate(battle_data):
+        key = canonical_matchup(scene_config["left"], scene_config["right"])
+        if key in outcomes:
+            left_win = outcomes[key]
+        elif row not in rows:
+            left_win = old_outcomes[key]
+        else:
+            left_win = simulate.predict_left_win(monster_data, scene_config["left"], scene_config["right"])
+        outcomes[key] = left_win
+        reporter.record(scene_config, left_win)
+    reporter.close()
+
+    if store_path is not None:
+        save_store(store_path, {
+            "version": STORE_VERSION,
+            "engine": engine,
+            "monsters": fingerprints,
+            "outcomes": outcomes,
+        })
+    return reporter, len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="只重新模拟受改动影响的对局")
+    parser.add_argument("csv", help="对局数据集")
+    parser.add_argument("--store", default="incremental_store.json", help="保存指纹和结果的文件")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    parser.add_argument("--errors", default="errors.json", help="误判输出文件")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data(args.monsters)
+    battle_data = simulate.process_battle_data(args.csv)
+    reporter, _ = reevaluate(battle_data, monster_data, args.store,
+                             EvaluationReporter(total=len(battle_data), error_path=args.errors))
+    print(reporter.summary())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
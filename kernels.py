@@ -0,0 +1,249 @@
+"""
+批量引擎的计算内核
+
+batch_engine.py 每帧最重的三步：最近敌人和距离矩阵、友军碰撞挤出、do_move 的积分和限位。
+这里各有一个 NumPy 实现和一个 Numba 编译的逐元素循环实现，两者的浮点运算顺序相同，结果逐位一致。
+安装了 Numba 时默认使用编译版本，否则自动回退到 NumPy；环境变量 ARKNIGHT_KERNELS=numpy 可以强制使用 NumPy。
+
+自检（在包的上一级目录）：
+    python -m arknight.kernels --battles 20 --batch 64
+测试（没有安装 numba 时跳过）：
+    python -m pytest tests/test_kernels.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# ---------------- NumPy ----------------
+
+def nearest_enemy_numpy(position, alive, enemy):
+    """每个单位最近的存活敌人（没有时为 -1），以及单位两两之间的位移和距离"""
+    diff = position[:, None, :, :] - position[:, :, None, :]
+    dist = np.sqrt((diff ** 2).sum(axis=-1))
+    candidate = alive[:, None, :] & enemy[None]
+    masked = np.where(candidate, dist, np.inf)
+    nearest = masked.argmin(axis=-1)
+    has_enemy = np.isfinite(np.take_along_axis(masked, nearest[..., None], axis=-1)[..., 0])
+    return np.where(has_enemy, nearest, -1), diff, dist
+
+
+def collide_numpy(velocity, acting, alive, same_faction, blocked, diff, dist, hit_radius):
+    """友军之间的碰撞挤出，原地修改 velocity"""
+    self_radius = np.where(blocked, hit_radius * 0.2, hit_radius)
+    other_radius = np.where(blocked, hit_radius * 0.1, hit_radius)
+    hardness = np.where(blocked, 1, 5)
+    limit = self_radius[:, :, None] + other_radius[:, None, :]
+    pair = (acting[:, :, None] & alive[:, None, :] & same_faction[None]
+            & (dist <= hit_radius * 2) & (dist < limit))
+    if not pair.any():
+        return
+    safe_dist = np.maximum(dist, 0.0001)
+    unit = diff / safe_dist[..., None]
+    push = np.where(pair, limit - safe_dist + 0.02, 0)
+    h1 = hardness[:, None, :]
+    h2 = hardness[:, :, None]
+    velocity -= (unit * (push * h1 / (h1 + h2))[..., None]).sum(axis=2)
+    velocity += (unit * (push * h2 / (h1 + h2))[..., None]).sum(axis=1)
+
+
+def do_move_numpy(position, velocity, alive, slow, move_speed, delta_time, scale, map_size):
+    """限速、积分、阻挡或攻击时减速、限制在地图内，原地修改 position 和 velocity"""
+    moving = alive[..., None]
+    speed = np.linalg.norm(velocity, axis=-1)
+    over = speed > move_speed
+    clamped = velocity / np.where(speed > 0, speed, 1)[..., None] * move_speed[..., None]
+    velocity[...] = np.where((over & alive)[..., None], clamped, velocity)
+    position[...] = np.where(moving, position + velocity * delta_time * scale, position)
+    velocity[...] = np.where((slow & alive)[..., None], velocity * 0.5, velocity)
+    velocity[...] = np.where(moving, velocity, 0)
+    np.clip(position[..., 0], 0, map_size[0], out=position[..., 0])
+    np.clip(position[..., 1], 0, map_size[1], out=position[..., 1])
+
+
+# ---------------- Numba ----------------
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _nearest_enemy_loops(position, alive, enemy):
+        B, N = alive.shape
+        diff = np.empty((B, N, N, 2))
+        dist = np.empty((B, N, N))
+        nearest = np.full((B, N), -1, dtype=np.int64)
+        for b in range(B):
+            for i in range(N):
+                best = np.inf
+                for j in range(N):
+                    dx = position[b, j, 0] - position[b, i, 0]
+                    dy = position[b, j, 1] - position[b, i, 1]
+                    d = np.sqrt(dx ** 2 + dy ** 2)
+                    diff[b, i, j, 0] = dx
+                    diff[b, i, j, 1] = dy
+                    dist[b, i, j] = d
+                    if alive[b, j] and enemy[i, j] and d < best:
+                        best = d
+                        nearest[b, i] = j
+        return nearest, diff, dist
+
+    @numba.njit(cache=True)
+    def _collide_loops(velocity, acting, alive, same_faction, blocked, diff, dist, hit_radius):
+        B, N = alive.shape
+        first = np.zeros((N, 2))
+        second = np.zeros((N, 2))
+        for b in range(B):
+            # 与 NumPy 版本相同：先对所有 i 按 j 顺序累加推力并减去，再对所有 j 按 i 顺序累加并加上
+            first[:] = 0.0
+            second[:] = 0.0
+            for i in range(N):
+                if not acting[b, i]:
+                    continue
+                r1 = hit_radius * 0.2 if blocked[b, i] else hit_radius
+                h2 = 1 if blocked[b, i] else 5
+                for j in range(N):
+                    if not (alive[b, j] and same_faction[i, j]):
+                        continue
+                    d = dist[b, i, j]
+                    limit = r1 + (hit_radius * 0.1 if blocked[b, j] else hit_radius)
+                    if not (d <= hit_radius * 2 and d < limit):
+                        continue
+                    safe = max(d, 0.0001)
+                    push = limit - safe + 0.02
+                    h1 = 1 if blocked[b, j] else 5
+                    a = push * h1 / (h1 + h2)
+                    c = push * h2 / (h1 + h2)
+                    for k in range(2):
+                        u = diff[b, i, j, k] / safe
+                        first[i, k] += u * a
+                        second[j, k] += u * c
+            for i in range(N):
+                for k in range(2):
+                    velocity[b, i, k] -= first[i, k]
+            for j in range(N):
+                for k in range(2):
+                    velocity[b, j, k] += second[j, k]
+
+    @numba.njit(cache=True)
+    def _do_move_loops(position, velocity, alive, slow, move_speed, delta_time, scale, map_w, map_h):
+        B, N = alive.shape
+        for b in range(B):
+            for i in range(N):
+                if not alive[b, i]:
+                    # 与 NumPy 版本相同：死亡单位不移动，但位置同样限制在地图内
+                    velocity[b, i, 0] = 0.0
+                    velocity[b, i, 1] = 0.0
+                    position[b, i, 0] = min(max(position[b, i, 0], 0.0), map_w)
+                    position[b, i, 1] = min(max(position[b, i, 1], 0.0), map_h)
+                    continue
+                vx = velocity[b, i, 0]
+                vy = velocity[b, i, 1]
+                speed = np.sqrt(vx * vx + vy * vy)
+                limit = move_speed[b, i]
+                if speed > limit:
+                    vx = vx / speed * limit
+                    vy = vy / speed * limit
+                x = position[b, i, 0] + vx * delta_time * scale
+                y = position[b, i, 1] + vy * delta_time * scale
+                if slow[b, i]:
+                    vx = vx * 0.5
+                    vy = vy * 0.5
+                velocity[b, i, 0] = vx
+                velocity[b, i, 1] = vy
+                position[b, i, 0] = min(max(x, 0.0), map_w)
+                position[b, i, 1] = min(max(y, 0.0), map_h)
+
+    def nearest_enemy_numba(position, alive, enemy):
+        return _nearest_enemy_loops(np.ascontiguousarray(position), alive, enemy)
+
+    def collide_numba(velocity, acting, alive, same_faction, blocked, diff, dist, hit_radius):
+        _collide_loops(velocity, acting, alive, same_faction, blocked, diff, dist, float(hit_radius))
+
+    def do_move_numba(position, velocity, alive, slow, move_speed, delta_time, scale, map_size):
+        _do_move_loops(position, velocity, alive, slow, np.ascontiguousarray(move_speed, dtype=np.float64),
+                       float(delta_time), float(scale), float(map_size[0]), float(map_size[1]))
+
+
+class Kernels:
+    def __init__(self, name):
+        if name == "numba" and numba is None:
+            raise ImportError("没有安装 numba")
+        self.name = name
+        namespace = globals()
+        self.nearest_enemy = namespace[f"nearest_enemy_{name}"]
+        self.collide = namespace[f"collide_{name}"]
+        self.do_move = namespace[f"do_move_{name}"]
+
+
+def available_backends():
+    return ["numpy"] + (["numba"] if numba is not None else [])
+
+
+def default_backend():
+    name = os.environ.get("ARKNIGHT_KERNELS")
+    if name in available_backends():
+        return name
+    return "numba" if numba is not None else "numpy"
+
+
+def get_kernels(name=None):
+    return Kernels(name or default_backend())
+
+
+def check_backends(monster_data, scenes, batch_size=32, seed=0):
+    """用相同的种子分别在两个后端上跑批量对局，返回 (逐位一致的对局数, 总数, 每个后端的耗时)"""
+    from .batch_engine import BatchBattlefield
+
+    same = 0
+    total = 0
+    elapsed = {name: 0.0 for name in available_backends()}
+    for i, scene in enumerate(scenes):
+        outputs = []
+        for name in available_backends():
+            batch = BatchBattlefield(monster_data, batch_size, seed=seed + i, backend=name)
+            if not batch.setup_battle(scene["left"], scene["right"]):
+                break
+            start = time.perf_counter()
+            batch.run_battle()
+            elapsed[name] += time.perf_counter() - start
+            outputs.append((batch.winners.copy(), batch.end_rounds.copy()))
+        if len(outputs) < 2:
+            continue
+        total += 1
+        same += all(np.array_equal(a, b) for a, b in zip(outputs[0], outputs[1]))
+    return same, total, elapsed
+
+
+def main(argv=None):
+    from . import simulate
+    from .batch_engine import BatchBattlefield
+
+    parser = argparse.ArgumentParser(description="比较 NumPy 和 Numba 内核在批量对局上的结果")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "arknights53.csv"))
+    parser.add_argument("--battles", type=int, default=20, help="最多使用多少个批量引擎支持的对局")
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    print(f"可用后端：{available_backends()}，默认 {default_backend()}")
+    if numba is None:
+        print("没有安装 numba，批量引擎使用 NumPy 内核")
+        return 0
+    monster_data = simulate.load_monster_data()
+    scenes = [s for s in simulate.process_battle_data(args.csv)
+              if BatchBattlefield.supports(s["left"], s["right"], monster_data)][:args.battles]
+    # 先编译一次，不计入耗时
+    check_backends(monster_data, scenes[:1], 2)
+    same, total, elapsed = check_backends(monster_data, scenes, args.batch)
+    print(f"逐位一致 {same} / {total} 个对局（每个 {args.batch} 场）")
+    print("，".join(f"{name} {t:.2f}s" for name, t in elapsed.items()))
+    return 0 if same == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
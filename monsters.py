@@ -1,7 +1,9 @@
+from collections import defaultdict
 from dataclasses import dataclass, field
 import json
 import math
 import random
+import threading
 import time
 from enum import Enum
 from typing import List
@@ -17,7 +19,7 @@ if TYPE_CHECKING:
     from battle_field import Battlefield
 
 from .elemental import ElementAccumulator, ElementType
-from .utils import BuffEffect, BuffType, DamageType, calculate_normal_dmg, debug_print, Faction
+from .utils import MOVE_SPEED_SCALE, VIRTUAL_TIME_DELTA, BuffEffect, BuffType, DamageType, calculate_normal_dmg, debug_print, Faction
 from .zone import WineZone
 
 
@@ -137,6 +139,14 @@ class StatusSystem:
         self.fire_dmg_counter = 0
         self.corrupt_dmg_counter = 0
         self.power_stay_counter = 0
+
+    def reset(self):
+        """对象池复用时原地清空"""
+        self.effects.clear()
+        self.original_attributes.clear()
+        self.fire_dmg_counter = 0
+        self.corrupt_dmg_counter = 0
+        self.power_stay_counter = 0
         
     def apply(self, effect):
         if effect.type in self.owner.immunity:
@@ -185,6 +195,11 @@ class StatusSystem:
         self.effects = new_effects
 
     def _process_dot(self, delta_time):
+        # 持续伤害按 30 帧/秒 的参考帧计时，每个参考帧按原来的逐帧逻辑走一步，30 帧时结果逐位不变
+        for _ in range(self.owner.battlefield.reference_steps):
+            self._process_dot_step(VIRTUAL_TIME_DELTA)
+
+    def _process_dot_step(self, delta_time):
         fire = next((e for e in self.effects if e.type == BuffType.FIRE), None)
         if fire:
             # 每秒造成伤害
@@ -266,9 +281,52 @@ class StatusSystem:
         elif effect.type == BuffType.INVINCIBLE2:
             self.owner.invincible = False
             self.owner.can_target = True
+            # 重新可以被选取，敌方单位的寻敌结果可能改变
+            if self.owner.battlefield is not None:
+                self.owner.battlefield.invalidate_targets(self.owner.faction)
+
+def _tracked_stat(name):
+    """修改后把 stats_dirty 置为 True 的属性，用来判断能否查伤害表"""
+    attr = "_" + name
+
+    def getter(self):
+        return getattr(self, attr)
+
+    def setter(self, value):
+        setattr(self, attr, value)
+        self.stats_dirty = True
+
+    return property(getter, setter)
+
 
 class Monster:
+    attack_power = _tracked_stat("attack_power")
+    attack_multiplier = _tracked_stat("attack_multiplier")
+    attack_type = _tracked_stat("attack_type")
+    phy_def = _tracked_stat("phy_def")
+    magic_resist = _tracked_stat("magic_resist")
+
     def __init__(self, data, faction, position, battlefield):
+        # 这些子对象在对象池复用时原地清空，见 reset
+        self.velocity : FastVector = FastVector(0, 0)
+        # move_toward_enemy 每帧复用的方向缓冲区
+        self.move_direction : FastVector = FastVector(0, 0)
+        self.status_system = StatusSystem(self)
+        self.element_system = ElementAccumulator(self)
+        self._init_state(data, faction, position, battlefield)
+
+    def reset(self, data, faction, position, battlefield):
+        """对象池复用：保留子对象并原地清空，去掉上一场战斗里添加的属性，其余属性与 __init__ 相同"""
+        kept = (self.velocity, self.move_direction, self.status_system, self.element_system)
+        self.__dict__.clear()
+        self.velocity, self.move_direction, self.status_system, self.element_system = kept
+        self.velocity.x = self.velocity.y = 0
+        self.move_direction.x = self.move_direction.y = 0
+        self.status_system.reset()
+        self.element_system.reset()
+        self._init_state(data, faction, position, battlefield)
+
+    def _init_state(self, data, faction, position, battlefield):
         self.name = data["名字"]
         self.faction = faction
 
@@ -292,15 +350,12 @@ class Monster:
         
         # 战斗状态
         self.position : FastVector = position
-        self.velocity : FastVector = FastVector(0, 0)
         self.target = None
         self.is_alive = True
         self.frozen = False
         self.dizzy = False
         self.invincible = False
         self.battlefield : 'Battlefield' = battlefield
-        self.status_system = StatusSystem(self)
-        self.element_system = ElementAccumulator(self)
         self.attack_multiplier = 1
         self.phys_dodge = 0
         self.blocked = False
@@ -315,6 +370,15 @@ class Monster:
         else:
             self.attack_animation = AttackAnimation(0.2, 0.5, 0.3, self)
 
+        # 伤害表中的行号，数值与模板一致时可以直接查表
+        self.template_index = battlefield.damage_table.index_of(data) if battlefield is not None else -1
+        self.stats_dirty = False
+        self.retired = False
+        # 注册在战场上的距离触发器
+        self.triggers = []
+        # 上一次寻敌的结果：(目标, 敌方阵营版本号, 战场累计位移, 最近与次近目标的距离差)
+        self.target_cache = None
+
     # 如果活着且不处于不可选取状态
     def can_be_target(self):
         return self.is_alive and self.can_target
@@ -324,6 +388,14 @@ class Monster:
         """生成时触发的逻辑"""
         pass
     
+    def kill(self):
+        """所有死亡都走这里：触发 on_death，没有复活（转阶段）的话从战场退役"""
+        self.is_alive = False
+        self.on_death()
+        if not self.is_alive and not self.retired:
+            self.retired = True
+            self.battlefield.retire_monster(self)
+
     def on_death(self):
         """真正死亡时触发的逻辑"""
         debug_print(f"{self.name}{self.id} 已死亡！")
@@ -363,32 +435,37 @@ class Monster:
     def move_toward_enemy(self, delta_time):
         """根据阵营向对方移动"""
         self.blocked = False
+        # 移动和碰撞都在原地修改向量，不创建临时对象
+        direction = self.move_direction.set(0, 0)
+        velocity = self.velocity
+        position = self.position
         if self.target and self.target.can_be_target():
             # 向目标移动
-            direction = self.target.position - self.position
+            direction.set_diff(self.target.position, position)
 
             if direction.magnitude <= self.attack_range:
                 # 已经在攻击范围内，停止移动
                 self.blocked = True
-                direction = FastVector(0, 0)
-        else:
-            direction = FastVector(0, 0)
-        
+                direction.set(0, 0)
 
         # 标准化移动向量并应用速度
-        norm_direction = direction.normalize()
+        direction.normalize()
         if not self.blocked and self.attack_state == AttackState.等待:
-            self.velocity = (self.velocity * 7 + norm_direction * self.move_speed) / 8
+            # 30 帧时就是 (v * 7 + dir * speed) / 8
+            blend = self.battlefield.velocity_blend
+            velocity.scale(blend).add_scaled(direction, self.move_speed * (1 - blend))
 
         RADIUS = self.battlefield.HIT_BOX_RADIUS
         selfRadius = RADIUS * 0.2 if self.blocked else RADIUS
         # 碰撞检测
-        for m in self.battlefield.query_monster(self.position, RADIUS * 2):
+        for m in self.battlefield.query_monster(position, RADIUS * 2):
             if not m.can_be_target() or m == self or m.faction != self.faction:
                 continue
-            dir = m.position - self.position
-            dist = np.maximum(dir.magnitude, 0.0001)
-            dir /= dist
+            dx = m.position.x - position.x
+            dy = m.position.y - position.y
+            dist = max(math.sqrt(dx**2 + dy**2), 0.0001)
+            dx /= dist
+            dy /= dist
 
             radius2 = RADIUS * 0.1 if m.blocked else RADIUS
             hardness1 = 1 if m.blocked else 5
@@ -396,22 +473,26 @@ class Monster:
             depth = selfRadius + radius2 - dist
             if dist < selfRadius + radius2:
                 # 发生碰撞，挤出
-                self.velocity -= dir * (depth + 0.02) * hardness1 / (hardness1 + hardness2)
-                m.velocity += dir * (depth + 0.02) * hardness2 / (hardness1 + hardness2)
+                push = depth + 0.02
+                velocity.x -= dx * push * hardness1 / (hardness1 + hardness2)
+                velocity.y -= dy * push * hardness1 / (hardness1 + hardness2)
+                m.velocity.x += dx * push * hardness2 / (hardness1 + hardness2)
+                m.velocity.y += dy * push * hardness2 / (hardness1 + hardness2)
     
     def do_move(self, delta_time):
+        velocity = self.velocity
         if self.frozen or self.dizzy or not self.is_alive:
-            self.velocity = FastVector(0, 0)
+            velocity.set(0, 0)
             return
 
-        if self.velocity.magnitude > self.move_speed:
-            self.velocity = self.velocity.normalize() * self.move_speed
+        velocity.clamp_length(self.move_speed)
 
         # 更新位置，为了和yj代码对齐乘以一个减速系数
-        self.position += self.velocity * delta_time * 0.6
+        self.position.x += velocity.x * delta_time * MOVE_SPEED_SCALE
+        self.position.y += velocity.y * delta_time * MOVE_SPEED_SCALE
 
         if self.blocked or self.attack_state != AttackState.等待:
-            self.velocity *= 0.5
+            velocity.scale(self.battlefield.velocity_damping)
             
         # 限制在场景范围内
         if self.position.x < 0:
@@ -470,6 +551,8 @@ class Monster:
         
         self.frame_counter += 1
         self.on_extra_update(delta_time)
+        if self.triggers:
+            self.battlefield.fire_triggers(self)
         self.status_system.update(delta_time)
         self.update_elemental(delta_time)
 
@@ -485,7 +568,7 @@ class Monster:
         self.move_toward_enemy(delta_time)
         
         if self.attack_range <= 0.8:
-            if self.frame_counter % 3 == 0:
+            if self.frame_counter % self.battlefield.retarget_interval == 0:
                 self.target = self.find_target()
         # if target_ and np.linalg.norm(self.target.position - self.position) > self.attack_range and np.linalg.norm(target_.position - self.position) <= self.attack_range:
         #     self.target = target_
@@ -495,11 +578,55 @@ class Monster:
     
 
     def find_target(self):
-        """寻找最近的可攻击目标"""
-        targets = TargetSelector.select_targets(self, self.battlefield, need_in_range=False, max_targets=1)
-        if len(targets) > 0:
-            return targets[0]
-        return None
+        """寻找最近的可攻击目标
+
+        上一次搜索之后如果没有新的敌人出现、选中的目标仍然可以选取，并且所有单位累计的移动
+        不足以改变最近和次近目标的先后顺序，结果一定不变，直接返回上一次的结果。
+        """
+        battlefield = self.battlefield
+        cache = self.target_cache
+        if cache is not None:
+            target, epoch, motion, margin = cache
+            if (epoch == battlefield.target_epoch[self.enemy_faction()] and target.can_be_target()
+                    and 4 * (battlefield.motion - motion) + 1e-9 < margin):
+                battlefield.retarget_skipped += 1
+                return target
+        return self.search_target()
+
+    def enemy_faction(self):
+        return Faction.RIGHT if self.faction == Faction.LEFT else Faction.LEFT
+
+    def search_target(self):
+        """线性扫描寻找 嘲讽降序 -> 距离升序 的首选目标，与 TargetSelector.select_targets 的结果一致"""
+        battlefield = self.battlefield
+        battlefield.retarget_searches += 1
+        best = None
+        best_aggro = 0
+        best_dist = math.inf
+        second_dist = math.inf
+        has_aggro = False
+        for m in battlefield.alive_monsters:
+            if m.faction == self.faction or not m.can_be_target():
+                continue
+            dist = (m.position - self.position).magnitude
+            if m.aggro:
+                has_aggro = True
+            aggro = -m.aggro if dist <= self.attack_range else 0
+            if best is None or aggro < best_aggro or (aggro == best_aggro and dist < best_dist):
+                second_dist = min(second_dist, best_dist)
+                best = m
+                best_aggro = aggro
+                best_dist = dist
+            else:
+                second_dist = min(second_dist, dist)
+
+        # 有嘲讽单位时排序依赖攻击范围，不缓存
+        if best is None or has_aggro:
+            self.target_cache = None
+        else:
+            self.target_cache = (best, battlefield.target_epoch[self.enemy_faction()], battlefield.motion,
+                                 second_dist - best_dist)
+        return best
     
     def get_attack_power(self):
         return self.attack_multiplier * self.attack_power
@@ -520,6 +647,9 @@ class Monster:
 
     def calculate_damage(self, target, damage):
         """计算伤害值"""
+        if (not self.stats_dirty and not target.stats_dirty and damage == self._attack_power
+                and self.template_index >= 0 and target.template_index >= 0):
+            return self.battlefield.damage_table.rows[self.template_index][target.template_index]
         return calculate_normal_dmg(target.phy_def, target.magic_resist, damage, self.attack_type)
         # if self.attack_type == "物理":
         #     return calculate_normal_dmg(target.phy_def, 0, damage, False)
@@ -530,7 +660,7 @@ class Monster:
     
     def dodge_and_invincible(self, damage, attack_type : DamageType):
         if attack_type == DamageType.PHYSICAL and self.phys_dodge > 0:
-            if random.uniform(0, 1) < self.phys_dodge / 100:
+            if self.battlefield.rng.uniform(0, 1) < self.phys_dodge / 100:
                 return False
         if self.invincible:
             return False
@@ -542,8 +672,7 @@ class Monster:
             return False
         self.health -= damage
         if self.health <= 0:
-            self.is_alive = False
-            self.on_death()
+            self.kill()
         return True
 
 class AcidSlug(Monster):
@@ -571,7 +700,7 @@ class HighEnergySlug(Monster):
         explosion_radius = 1.25
         debug_print(f"{self.name} 即将自爆！")
 
-        self.battlefield.projectiles_manager.spawn_projectile(AOE炸弹(0.5, self.get_attack_power() * 4, DamageType.PHYSICAL, self, self.position, name="源石虫爆炸", aoeType=AOEType.Circle, radius=1.25))
+        self.battlefield.projectiles_manager.spawn(AOE炸弹, 0.5, self.get_attack_power() * 4, DamageType.PHYSICAL, self, self.position, name="源石虫爆炸", aoeType=AOEType.Circle, radius=1.25)
         # for m in self.battlefield.monsters:
         #     if m.faction != self.faction and m.is_alive:
         #         distance = np.linalg.norm(m.position - self.position)
@@ -657,8 +786,8 @@ class 大喷蛛(Monster):
     def spawn_small(self):
         debug_print(f"{self.name} 释放小喷蛛")
         self.battlefield.append_monster_name("小喷蛛", self.faction, self.position + FastVector(
-                        random.uniform(-1, 1) * 0.2,
-                        random.uniform(-1, 1) * 0.2
+                        self.battlefield.rng.uniform(-1, 1) * 0.2,
+                        self.battlefield.rng.uniform(-1, 1) * 0.2
                     ))
         
 class 鳄鱼(Monster):
@@ -721,8 +850,7 @@ class 狂暴宿主组长(Monster):
     def on_extra_update(self, delta_time):
         self.health -= 350 * delta_time
         if self.health <= 0:
-            self.is_alive = False
-            self.on_death()
+            self.kill()
             
 class 爱蟹者(Monster):
     def on_spawn(self):
@@ -806,7 +934,7 @@ class 高塔术师(Monster):
             return
         
         for t in targets:
-            self.battlefield.projectiles_manager.spawn_projectile(AOE炸弹锁定(0.1, self.get_attack_power(), DamageType.MAGIC, self, t, name="爆裂魔法", aoeType=AOEType.Grid8))
+            self.battlefield.projectiles_manager.spawn(AOE炸弹锁定, 0.1, self.get_attack_power(), DamageType.MAGIC, self, t, name="爆裂魔法", aoeType=AOEType.Grid8)
 
         debug_print(f"{self.name}{self.id} 射出爆裂魔法")
                     
@@ -883,6 +1011,7 @@ class 庞贝(Monster):
         self.ring_attack_counter = 0
         self.boss = True
         self.attack_animation = AttackAnimation(0.1, 0.1, 0.8, self)
+        self.battlefield.add_proximity_trigger(self, max(1.4, self.attack_range), self.ring_attack)
 
     def get_skill_bar(self):
         """技力在ui显示的内容"""
@@ -914,8 +1043,10 @@ class 庞贝(Monster):
             self.attack_speed += 40
             debug_print(f"{self.name} 进入狂暴模式")
         self.ring_attack_counter += delta_time
-        targets = TargetSelector.select_targets(self, self.battlefield, need_in_range=False, max_targets=9999)
-        if len(targets) > 0 and (targets[0].position - self.position).magnitude < 0.8:
+
+    def ring_attack(self, targets):
+        # 触发半径取攻击范围（不小于1.4），首选目标与全场排序的首选目标一致
+        if (targets[0].position - self.position).magnitude < 0.8:
             if self.ring_attack_counter >= 10.0:
                 targets = [t for t in targets if (t.position - self.position).magnitude < 1.4]
                 for tar in targets:
@@ -960,17 +1091,14 @@ class 雪球(Monster):
     def on_spawn(self):
         self.first_attack = True
         self.attack_animation = AttackAnimation(0.2, 0.1, 0.7, self)
+        # 第一个敌人进入攻击范围时投掷雪球
+        self.battlefield.add_proximity_trigger(self, None, self.throw_snowball, once=True)
 
-    def on_extra_update(self, delta_time):
-        if self.first_attack:
-            targets : list[Monster] = TargetSelector.select_targets(self, self.battlefield, need_in_range=True, max_targets=1)
-            if len(targets) == 0:
-                return
-                    
-            self.battlefield.projectiles_manager.spawn_projectile(AOE炸弹锁定(0.25, self.get_attack_power() * 1.5, DamageType.MAGIC, self, targets[0], name="雪球", aoeType=AOEType.Grid4))
-            self.attack_range = 0.8
-            self.first_attack = False
-            debug_print(f"{self.name}{self.id} 投掷雪球")
+    def throw_snowball(self, targets):
+        self.battlefield.projectiles_manager.spawn(AOE炸弹锁定, 0.25, self.get_attack_power() * 1.5, DamageType.MAGIC, self, targets[0], name="雪球", aoeType=AOEType.Grid4)
+        self.attack_range = 0.8
+        self.first_attack = False
+        debug_print(f"{self.name}{self.id} 投掷雪球")
 
 class 船长(Monster):
     """船长"""
@@ -1088,7 +1216,7 @@ class 杰斯顿(Monster):
             # 转阶段
             self.status_system.apply(switch_stage)
             self.status_system.apply(dizzy)
-            print(f"{self.name}{self.id}已进入狂暴状态")
+            debug_print(f"{self.name}{self.id}已进入狂暴状态")
         else:
             super().on_death()
 
@@ -1303,59 +1431,8 @@ class 萨克斯(Monster):
             super().attack(target, gameTime)
 
     def get_hit_enemies(self):
-        # 使用整数坐标进行快速分类
-        self_x = self.position.x
-        self_y = self.position.y
-        
-        smallest_up = 100
-        smallest_up_target = None
-
-        smallest_down = 100
-        smallest_down_target = None
-
-        smallest_left = 100
-        smallest_left_target = None
-
-        smallest_right = 100
-        smallest_right_target = None
-        # 预处理战场数据
-        for m in self.battlefield.monsters:
-            if m.faction == self.faction or not m.is_alive:
-                continue
-            
-            # 转换为整数坐标（优化距离计算效率）
-            x = m.position.x
-            y = m.position.y
-            
-            # 列坐标匹配（同一垂直方向）
-            if abs(x - self_x) <= 0.5:
-                if m.position.y > self.position.y and m.position.y - self.position.y < smallest_up:
-                    smallest_up = m.position.y - self.position.y
-                    smallest_up_target = m
-                if m.position.y < self.position.y and self.position.y - m.position.y < smallest_down:
-                    smallest_down = self.position.y - m.position.y
-                    smallest_down_target = m
-            
-            # 行坐标匹配（同一水平方向）
-            if abs(y - self_y) <= 0.5:
-                if m.position.x > self.position.x and m.position.x - self.position.x < smallest_right:
-                    smallest_right = m.position.x - self.position.x
-                    smallest_right_target = m
-                if m.position.x < self.position.x and self.position.x -m.position.x < smallest_left:
-                    smallest_left = self.position.x - m.position.x
-                    smallest_left_target = m
-        
-        targets = []
-        if smallest_up_target != None:
-            targets.append(smallest_up_target)
-        if smallest_down_target != None:
-            targets.append(smallest_down_target)
-        if smallest_left_target != None:
-            targets.append(smallest_left_target)
-        if smallest_right_target != None:
-            targets.append(smallest_right_target)
-        # 返回最近的敌人列表
-        return targets
+        # 上、下、左、右四个方向宽 1 格的条带内最近的敌人
+        return [m for m in self.battlefield.nearest_enemies_cardinal(self, 0.5) if m is not None]
     
 class 大君之赐(Monster):
     """大君之赐"""
@@ -1367,8 +1444,7 @@ class 大君之赐(Monster):
             damage *= 0.1
         self.health -= damage
         if self.health <= 0:
-            self.is_alive = False
-            self.on_death()
+            self.kill()
         return True
 
 class 萨卡兹链术师(Monster):
@@ -1469,8 +1545,8 @@ class 萨卡兹链术师(Monster):
     def on_death(self):
         debug_print(f"{self.name} 变成大君之赐")
         m = self.battlefield.append_monster_name("大君之赐", self.faction, self.position + FastVector(
-                        random.uniform(-1, 1) * 0.2,
-                        random.uniform(-1, 1) * 0.2
+                        self.battlefield.rng.uniform(-1, 1) * 0.2,
+                        self.battlefield.rng.uniform(-1, 1) * 0.2
                     ))
         switch_stage = BuffEffect(
                 type=BuffType.INVINCIBLE2,
@@ -1505,14 +1581,16 @@ class 狂躁珊瑚(Monster):
 
 
     def on_extra_update(self, delta_time):
-        self.decay_timer += delta_time
-        if self.decay_timer > 3.5 and abs(round(self.decay_timer - 3.5) - (self.decay_timer - 3.5)) < 0.001:
-            if self.attack_stack > 0:
-                self.attack_stack -= 2
-                self.attack_multiplier -= 0.3
-            else:
-                self.attack_stack = 0
-                self.attack_multiplier = 1
+        # 按参考帧累加，30 帧时与原来逐帧累加的计时逐位相同
+        for _ in range(self.battlefield.reference_steps):
+            self.decay_timer += VIRTUAL_TIME_DELTA
+            if self.decay_timer > 3.5 and abs(round(self.decay_timer - 3.5) - (self.decay_timer - 3.5)) < 0.001:
+                if self.attack_stack > 0:
+                    self.attack_stack -= 2
+                    self.attack_multiplier -= 0.3
+                else:
+                    self.attack_stack = 0
+                    self.attack_multiplier = 1
 
     def attack(self, target, delta_time):
         direction = target.position - self.position
@@ -1549,7 +1627,7 @@ class 炮god(Monster):
         if len(targets) == 0:
             return
         
-        self.battlefield.projectiles_manager.spawn_projectile(AOE炸弹锁定(0.2, self.get_attack_power(), self.attack_type, self, targets[0], name="火箭弹", aoeType=AOEType.Grid8))
+        self.battlefield.projectiles_manager.spawn(AOE炸弹锁定, 0.2, self.get_attack_power(), self.attack_type, self, targets[0], name="火箭弹", aoeType=AOEType.Grid8)
 
         debug_print(f"{self.name}{self.id} 开炮")
 
@@ -1563,25 +1641,28 @@ class 榴弹佣兵(Monster):
         # 状态2：近战状态
         self.stage = 0
         self.stage_counter = 0
+        # 目标进入攻击范围时射出火箭弹
+        self.battlefield.add_target_range_trigger(self, None, self.fire_rocket, once=True)
 
-    def on_extra_update(self, delta_time):
-        if self.stage == 0:
-            if self.target is not None:
-                direction = self.target.position - self.position
-                distance = direction.magnitude
-                if distance <= self.attack_range:
-                    self.battlefield.projectiles_manager.spawn_projectile(AOE炸弹锁定(0.2, self.get_attack_power() * 2, self.attack_type, self, self.target, name="火箭弹", aoeType=AOEType.Grid8))
-                    self.stage = 1
-                    debug_print(f"{self.name}{self.id} 射出火箭弹")
+    def fire_rocket(self, target):
+        self.battlefield.projectiles_manager.spawn(AOE炸弹锁定, 0.2, self.get_attack_power() * 2, self.attack_type, self, target, name="火箭弹", aoeType=AOEType.Grid8)
+        self.stage = 1
+        debug_print(f"{self.name}{self.id} 射出火箭弹")
+        # 射击的这一帧也计入切换时间
+        self.switch_stage(self.battlefield.delta_time)
 
+    def on_extra_update(self, delta_time):
         if self.stage == 1:
-            self.stage_counter += delta_time
-            if self.stage_counter >= 1.14:
-                # 变为近战形态
-                self.stage = 2
-                self.stage_counter = 0
-                self.move_speed += 2 * self.move_speed
-                self.attack_range = 0.8
+            self.switch_stage(delta_time)
+
+    def switch_stage(self, delta_time):
+        self.stage_counter += delta_time
+        if self.stage_counter >= 1.14:
+            # 变为近战形态
+            self.stage = 2
+            self.stage_counter = 0
+            self.move_speed += 2 * self.move_speed
+            self.attack_range = 0.8
 
 
 class 凋零萨卡兹(Monster):
@@ -1598,6 +1679,8 @@ class 凋零萨卡兹(Monster):
         self.original_move_speed = self.move_speed
         self.locked_target = None
         self.attack_animation = AttackAnimation(0.1, 0.1, 0.8, self)
+        # 攻击范围内有敌人时才可能锁定目标开始蓄力
+        self.battlefield.add_proximity_trigger(self, None, self.start_charging)
     
     def increase_skill_cd(self, delta_time):
         if self.stage == 0:
@@ -1619,23 +1702,18 @@ class 凋零萨卡兹(Monster):
             return 8
         return super().get_max_skill_bar()
 
-    def lock_target(self):
-        targets = TargetSelector.select_targets(self, self.battlefield, need_in_range=True, max_targets=1)
-        if len(targets) > 0:
-            return targets[0]
-        return None
+    def start_charging(self, targets):
+        # 如果处于默认状态，锁定攻击范围内的首选目标释放技能
+        if self.stage == 0 and self.skill_counter >= 24:
+            self.locked_target = targets[0]
+            self.stage = 1
+            self.move_speed = 0
+            self.charging_counter = 0
+            self.skill_counter = 0
+            debug_print(f"{self.name}{self.id} 开始蓄力")
 
     def on_extra_update(self, delta_time):
-        # 如果处于默认状态，释放技能
-        if self.stage == 0 and self.skill_counter >= 24:
-            self.locked_target = self.lock_target()
-            if self.locked_target:
-                self.stage = 1
-                self.move_speed = 0
-                self.charging_counter = 0
-                self.skill_counter = 0
-                debug_print(f"{self.name}{self.id} 开始蓄力")
-        elif self.stage == 1:
+        if self.stage == 1:
             if not self.locked_target.can_be_target():
                 self.stage = 0
                 self.move_speed = self.original_move_speed
@@ -1768,8 +1846,7 @@ class 护盾哥(Monster):
                     damage = 0
         self.health -= damage
         if self.health <= 0:
-            self.is_alive = False
-            self.on_death()
+            self.kill()
         return True
 
 class 酒桶(Monster):
@@ -1852,7 +1929,7 @@ class 门(Monster):
         ]
         if not enemies:
             return
-        target = random.choice(enemies)
+        target = self.battlefield.rng.choice(enemies)
         debug_print(f"{self.name}{self.id} 带走了{target.name}{target.id}")
         target.health = 0
         target.invincible = False
@@ -1905,8 +1982,7 @@ class 雷德(Monster):
                 self.health = self.max_health * 0.5
                 self.move_speed = 0
             else:
-                self.is_alive = False
-                self.on_death()
+                self.kill()
         return True
     
 
@@ -2022,8 +2098,7 @@ class 自在(Monster):
                 self.attack_power += self.attack_power * 0.1
                 self.move_speed = 0
                 return False
-            self.is_alive = False
-            self.on_death()
+            self.kill()
         return True
     
 class MonsterFactory:
@@ -2078,6 +2153,11 @@ class MonsterFactory:
         # 添加更多映射...
         "炮god": 炮god
     }
+
+    # 召唤物对象池：类 -> 空闲的怪物，同一进程里跨战斗复用。服务端的多个线程可能同时存取，用锁保护
+    _summon_pool = defaultdict(list)
+    _summon_lock = threading.Lock()
+    MAX_POOL_SIZE = 256
     
     @classmethod
     def create_monster(cls, data, faction, position, battlefield):
@@ -2088,3 +2168,42 @@ class MonsterFactory:
             return m
         else:
             return Monster(data, faction, position, battlefield)  # 默认类型
+
+    @staticmethod
+    def _poolable(monster_class):
+        # 自己定义了 __init__ 的类，reset 不知道怎么重建它的属性
+        return monster_class.__init__ is Monster.__init__
+
+    @classmethod
+    def acquire_monster(cls, data, faction, position, battlefield):
+        """与 create_monster 相同，但优先从对象池中取出同类的怪物原地重置"""
+        monster_class = cls._monster_classes.get(data["名字"], Monster)
+        m = None
+        if cls._poolable(monster_class):
+            with cls._summon_lock:
+                free = cls._summon_pool.get(monster_class)
+                if free:
+                    m = free.pop()
+        if m is None:
+            return cls.create_monster(data, faction, position, battlefield)
+        m.reset(data, faction, position, battlefield)
+        if data["名字"] in cls._monster_classes:
+            m.on_spawn()
+        return m
+
+    @classmethod
+    def release_monster(cls, monster):
+        """把不再使用的怪物放回对象池，只断开对战场和其他单位的引用，属性在下次 reset 时重新设置"""
+        monster_class = type(monster)
+        if not cls._poolable(monster_class):
+            return
+        monster.battlefield = None
+        monster.target = None
+        monster.target_cache = None
+        monster.triggers = []
+        monster.status_system.reset()
+        monster.element_system.reset()
+        with cls._summon_lock:
+            free = cls._summon_pool[monster_class]
+            if len(free) < cls.MAX_POOL_SIZE:
+                free.append(monster)
@@ -1,6 +1,8 @@
 # 射弹基础组件
 
+from collections import defaultdict
 from enum import Enum
+import threading
 import numpy as np
 from .utils import DamageType, calculate_normal_dmg, debug_print
 from typing import TYPE_CHECKING
@@ -24,12 +26,20 @@ class Projectile:
         """需被子类重写"""
         raise NotImplementedError
 
+    def release(self):
+        """放回对象池前断开对怪物的引用"""
+        self.source = None
+
 # 组件类型实现
 class HomingProjectile(Projectile):
     def __init__(self, max_lifetime, damage : float, damageType : DamageType, source : "Monster", target_enemy: "Monster"):
         super().__init__(max_lifetime, damage, damageType, source)
         self.target = target_enemy  # 敌人对象引用
 
+    def release(self):
+        super().release()
+        self.target = None
+
     def update(self, delta_time, battle_field):
         if not self.target.is_alive:
             self.is_alive = False
@@ -61,23 +71,56 @@ class TimedProjectile(Projectile):
 
 
 class ProjectileManager:
+    # 射弹对象池：类型 -> 空闲的射弹，进程内所有战场共用。服务端的多个线程可能同时存取，用锁保护
+    _pool = defaultdict(list)
+    _pool_lock = threading.Lock()
+    MAX_POOL_SIZE = 256
+
     def __init__(self, battle_field : 'Battlefield'):
         self.projectiles = []
         self.global_id_counter = 0
         self.battle_field = battle_field
 
+    def spawn(self, cls, *args, **kwargs) -> Projectile:
+        """使用对象池创建射弹：有空闲的同类射弹时原地重新初始化"""
+        projectile = None
+        with ProjectileManager._pool_lock:
+            free = ProjectileManager._pool.get(cls)
+            if free:
+                projectile = free.pop()
+        if projectile is not None:
+            projectile.__init__(*args, **kwargs)
+        else:
+            projectile = cls(*args, **kwargs)
+        self.spawn_projectile(projectile)
+        return projectile
+
     def spawn_projectile(self, projectile : Projectile):
-        """使用对象池创建射弹"""
+        """添加一个已经创建好的射弹"""
         self.projectiles.append(projectile)
         projectile.id = self.global_id_counter
         self.global_id_counter += 1
 
     def update_all(self, delta_time):
-        """更新并过滤无效射弹"""
+        """更新并过滤无效射弹，失效的射弹放回对象池"""
         for p in self.projectiles:
             p.update(delta_time, self.battle_field)
 
-        self.projectiles = [p for p in self.projectiles if p.is_alive]
+        alive = []
+        dead = []
+        for p in self.projectiles:
+            if p.is_alive:
+                alive.append(p)
+            else:
+                p.release()
+                dead.append(p)
+        self.projectiles = alive
+        if dead:
+            with ProjectileManager._pool_lock:
+                for p in dead:
+                    free = ProjectileManager._pool[type(p)]
+                    if len(free) < ProjectileManager.MAX_POOL_SIZE:
+                        free.append(p)
 
 
 class AOEType(Enum):
@@ -0,0 +1,92 @@
+"""
+帧快照环形缓冲区
+
+在批量生产环境里也能低开销地记录战斗画面：保存最近 N 帧（或者每 k 帧一帧），
+每帧记录所有单位的位置、血量比例、阵营和攻击状态。数据放在预先分配好的 NumPy 数组里，
+而不是 Python 对象，可以导出成 .npz 离线画图或者生成视频。
+
+单位按 monster.id 存放在固定的列上，图标（char_icon）在单位的一生中不变，所以每个单位只存一份。
+"""
+import numpy as np
+
+
+class FrameRecorder:
+    def __init__(self, capacity=300, every=1, max_units=128):
+        self.capacity = capacity
+        self.every = every
+        self.count = 0  # 总共记录过的帧数
+
+        self.rounds = np.zeros(capacity, dtype=np.int32)
+        self.game_time = np.zeros(capacity, dtype=np.float32)
+        self._allocate_units(max_units)
+
+    def _allocate_units(self, max_units):
+        self.max_units = max_units
+        self.positions = np.zeros((self.capacity, max_units, 2), dtype=np.float32)
+        self.health = np.zeros((self.capacity, max_units), dtype=np.float32)
+        self.faction = np.full((self.capacity, max_units), -1, dtype=np.int8)
+        self.attack_state = np.zeros((self.capacity, max_units), dtype=np.int8)
+        self.icons = np.full(max_units, '', dtype='U2')
+
+    def _grow(self, needed):
+        """出现了更多单位（召唤物），扩大单位维度"""
+        max_units = self.max_units
+        while max_units <= needed:
+            max_units *= 2
+        old = (self.positions, self.health, self.faction, self.attack_state, self.icons)
+        self._allocate_units(max_units)
+        n = old[0].shape[1]
+        self.positions[:, :n] = old[0]
+        self.health[:, :n] = old[1]
+        self.faction[:, :n] = old[2]
+        self.attack_state[:, :n] = old[3]
+        self.icons[:n] = old[4]
+
+    def capture(self, battlefield):
+        """记录当前帧，由 Battlefield.run_one_frame 调用"""
+        if battlefield.round % self.every != 0:
+            return
+        units = [m for m in battlefield.alive_monsters if m.is_alive]
+        ids = [m.id for m in units]
+        if ids and max(ids) >= self.max_units:
+            self._grow(max(ids))
+
+        slot = self.count % self.capacity
+        self.count += 1
+        self.rounds[slot] = battlefield.round
+        self.game_time[slot] = battlefield.gameTime
+        self.faction[slot] = -1
+        if not units:
+            return
+        self.positions[slot, ids] = [(m.position.x, m.position.y) for m in units]
+        self.health[slot, ids] = [m.health / m.max_health for m in units]
+        self.faction[slot, ids] = [m.faction.value for m in units]
+        self.attack_state[slot, ids] = [m.attack_state.value for m in units]
+        self.icons[ids] = [m.char_icon for m in units]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _order(self):
+        """按时间顺序排列的槽位"""
+        if self.count <= self.capacity:
+            return np.arange(self.count)
+        start = self.count % self.capacity
+        return np.concatenate([np.arange(start, self.capacity), np.arange(start)])
+
+    def frames(self):
+        """按时间顺序返回记录的数据（faction 为 -1 表示该帧这个单位不在场）"""
+        order = self._order()
+        return {
+            "rounds": self.rounds[order],
+            "game_time": self.game_time[order],
+            "positions": self.positions[order],
+            "health": self.health[order],
+            "faction": self.faction[order],
+            "attack_state": self.attack_state[order],
+            "icons": self.icons,
+        }
+
+    def export(self, path):
+        """导出为 .npz 文件"""
+        np.savez_compressed(path, every=self.every, **self.frames())
@@ -0,0 +1,128 @@
+"""
+终端可视化渲染器
+
+可视化模式下原来是在模拟线程里每30帧打印整个网格再 sleep 1 秒。
+TerminalRenderer 在自己的线程里从有界队列取帧快照，用 ANSI 光标移动只重画变化的格子，
+模拟线程不会被阻塞：渲染跟不上时直接丢弃旧的帧。
+渲染期间 debug_print 的输出交给 log，只在网格下方显示最近几行，不会和重画交错。
+"""
+import collections
+import queue
+import sys
+import threading
+import time
+
+from .utils import Faction
+
+
+class TerminalRenderer:
+    def __init__(self, map_size, fps=10, queue_size=2, stream=None, log_lines=5):
+        self.width = int(map_size[0]) * 2
+        self.height = int(map_size[1]) * 2
+        self.fps = fps
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.stream = stream if stream is not None else sys.stdout
+        self.dropped = 0
+        self.log_lines = log_lines
+        self.messages = collections.deque(maxlen=log_lines)
+
+        self._grid = None
+        self._shown = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="TerminalRenderer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """画完队列里剩下的帧后退出"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.stream.write(f"\x1b[{self.height + 2 + self.log_lines};1H")
+        self.stream.flush()
+
+    def log(self, msg):
+        """记录一条日志，模拟线程调用；deque 的 append 是线程安全的"""
+        for line in str(msg).splitlines():
+            if line.strip():
+                self.messages.append(line)
+
+    def wants_frame(self):
+        """队列满了就不用再生成快照"""
+        return not self.frames.full()
+
+    def submit(self, frame):
+        """提交一帧快照，不会阻塞；队列满时丢弃最旧的一帧"""
+        try:
+            self.frames.put_nowait(frame)
+        except queue.Full:
+            try:
+                self.frames.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        while True:
+            try:
+                frame = self.frames.get(timeout=interval)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            start = time.perf_counter()
+            self.draw(frame)
+            if self._stop.is_set() and self.frames.empty():
+                return
+            rest = interval - (time.perf_counter() - start)
+            if rest > 0 and not self._stop.is_set():
+                time.sleep(rest)
+
+    def build_grid(self, units):
+        """把单位放进字符网格，规则与 Battlefield.print_battlefield 相同"""
+        grid = [['.'] * self.width for _ in range(self.height)]
+        for (x, y, faction, icon) in units:
+            gx = min(max(0, int(x * 2)), self.width - 1)
+            gy = min(max(0, int(y * 2)), self.height - 1)
+            symbol = 'L' if faction == Faction.LEFT else 'R'
+            if grid[gy][gx] != '.' and symbol != grid[gy][gx]:
+                symbol = 'X'
+            if icon != "":
+                symbol = icon
+            grid[gy][gx] = symbol
+        return grid
+
+    def draw(self, frame):
+        round, units = frame
+        grid = self.build_grid(units)
+        out = []
+        if self._grid is None:
+            # 第一帧：清屏后完整画一次
+            out.append("\x1b[2J\x1b[H")
+            out.append(f"Round {round}\n")
+            out.extend(' '.join(row) + "\n" for row in grid)
+        else:
+            out.append(f"\x1b[1;1HRound {round}\x1b[K")
+            for y, (row, old_row) in enumerate(zip(grid, self._grid)):
+                for x, (symbol, old_symbol) in enumerate(zip(row, old_row)):
+                    if symbol != old_symbol:
+                        out.append(f"\x1b[{y + 2};{x * 2 + 1}H{symbol}")
+        shown = list(self.messages)
+        if shown != self._shown:
+            # 一个汉字占两列，截到网格宽度以内，避免折行把下面的画面顶乱
+            for i in range(self.log_lines):
+                line = shown[i][:self.width] if i < len(shown) else ""
+                out.append(f"\x1b[{self.height + 2 + i};1H{line}\x1b[K")
+            self._shown = shown
+        out.append(f"\x1b[{self.height + 2 + self.log_lines};1H")
+        self._grid = grid
+        self.stream.write(''.join(out))
+        self.stream.flush()
@@ -0,0 +1,129 @@
+"""
+评估结果汇报
+
+批量评估时每场都打印一行、每次误判都重新打开 errors.json 追加，这些 I/O 在高速模拟下占了不少时间。
+EvaluationReporter 把误判缓存起来按批写成 JSONL，进度行限制刷新频率，
+结束时输出按怪物统计的正确率和混淆表，方便找出哪个 MonsterFactory 类误差最大。
+"""
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+
+from .monsters import Monster, MonsterFactory
+from .utils import Draw
+
+
+class MonsterStats:
+    """单个怪物参与的对局统计"""
+    __slots__ = ['matches', 'correct', 'false_left', 'false_right']
+
+    def __init__(self):
+        self.matches = 0
+        self.correct = 0
+        self.false_left = 0   # 预测左胜，实际右胜
+        self.false_right = 0  # 预测右胜，实际左胜
+
+    @property
+    def accuracy(self):
+        return self.correct / self.matches if self.matches else 0.0
+
+
+class EvaluationReporter:
+    def __init__(self, total=None, error_path="errors.json", flush_every=200, progress_interval=0.5, stream=None):
+        self.total = total
+        self.error_path = error_path
+        self.flush_every = flush_every
+        self.progress_interval = progress_interval
+        self.stream = stream if stream is not None else sys.stdout
+
+        self.matches = 0
+        self.correct = 0
+        # 混淆表：(实际结果, 预测结果) -> 次数
+        self.confusion = defaultdict(int)
+        self.monster_stats = defaultdict(MonsterStats)
+        # 单局结局（Faction 或 Draw）-> 次数，由调用方在模拟时计入，见 simulate.predict_left_win
+        self.outcomes = Counter()
+
+        self._error_buffer = []
+        self._start_time = time.perf_counter()
+        self._last_progress = 0
+
+    def record(self, scene_config, left_win):
+        """记录一场对局的预测结果"""
+        actual = scene_config["result"]
+        predicted = "left" if left_win else "right"
+        correct = actual == predicted
+
+        self.matches += 1
+        self.confusion[(actual, predicted)] += 1
+        if correct:
+            self.correct += 1
+        else:
+            self._error_buffer.append(json.dumps(scene_config, ensure_ascii=False))
+            if len(self._error_buffer) >= self.flush_every:
+                self.flush()
+
+        names = set(scene_config["left"]) | set(scene_config["right"])
+        for name in names:
+            stats = self.monster_stats[name]
+            stats.matches += 1
+            if correct:
+                stats.correct += 1
+            elif left_win:
+                stats.false_left += 1
+            else:
+                stats.false_right += 1
+
+        now = time.perf_counter()
+        if now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            self.print_progress()
+
+    def flush(self):
+        """把缓存的误判写入文件"""
+        if not self._error_buffer or self.error_path is None:
+            self._error_buffer.clear()
+            return
+        with open(self.error_path, encoding='utf-8', mode='a') as f:
+            f.write('\n'.join(self._error_buffer))
+            f.write('\n')
+        self._error_buffer.clear()
+
+    def print_progress(self):
+        elapsed = time.perf_counter() - self._start_time
+        speed = self.matches / elapsed if elapsed > 0 else 0
+        total = f"/{self.total}" if self.total else ""
+        self.stream.write(f"\r进度 {self.matches}{total}  当前胜率：{self.correct} / {self.matches}"
+                          f" ({self.accuracy:.2%})  {speed:.2f} 场/秒")
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        self.print_progress()
+        self.stream.write("\n")
+        self.stream.flush()
+
+    @property
+    def accuracy(self):
+        return self.correct / self.matches if self.matches else 0.0
+
+    def summary(self, top=20):
+        """总体混淆表和按怪物统计的正确率（误判最多的排在前面）"""
+        lines = [f"总正确率：{self.correct} / {self.matches} ({self.accuracy:.2%})",
+                 "",
+                 "混淆表      预测左胜  预测右胜",
+                 f"实际左胜  {self.confusion[('left', 'left')]:>9}  {self.confusion[('left', 'right')]:>8}",
+                 f"实际右胜  {self.confusion[('right', 'left')]:>9}  {self.confusion[('right', 'right')]:>8}",
+                 "",
+                 f"{'怪物':<10}{'类':<12}{'场次':>8}{'正确率':>9}{'误判左胜':>9}{'误判右胜':>9}"]
+
+        if self.outcomes:
+            lines[1:1] = [f"超时平局：{self.outcomes[Draw.TIMEOUT]} 次，僵局平局：{self.outcomes[Draw.STALEMATE]} 次"]
+        ranked = sorted(self.monster_stats.items(),
+                        key=lambda item: (-(item[1].matches - item[1].correct), item[1].accuracy, item[0]))
+        for name, stats in ranked[:top]:
+            cls = MonsterFactory._monster_classes.get(name, Monster).__name__
+            lines.append(f"{name:<10}{cls:<12}{stats.matches:>8}{stats.accuracy:>9.2%}"
+                         f"{stats.false_left:>9}{stats.false_right:>9}")
+        return "\n".join(lines)
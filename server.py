@@ -0,0 +1,230 @@
+"""
+常驻模拟服务
+
+每个需要战斗结果的工具都要重新启动 Python、导入依赖、解析 monsters.json。
+这里启动一个长期运行的服务，模板只加载一次，从 stdin 或 Unix socket 按行读取 JSON 请求，
+放到进程池里模拟，指定了种子的请求的结果保存在内存 LRU 中，结果完成一条就写回一条。
+
+请求格式（与 requests.jsonl / scene.json 相同的阵容写法）：
+    {"request_id": "a1", "left": {"阿咬": 5}, "right": [{"name": "狗pro", "count": 3}], "trials": 3, "seed": 0}
+响应：
+    {"request_id": "a1", "winners": ["LEFT", "LEFT", "RIGHT"], "left_win_rate": 0.667, "cached": false, "elapsed_ms": 812.5}
+
+用法（在包的上一级目录）：
+    python -m arknight.server --workers 4
+    python -m arknight.server --socket /tmp/arknight.sock
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from . import simulate, utils
+from .battle_field import Battlefield
+from .utils import canonical_matchup, normalize_army
+
+_monster_data = None
+
+
+def _init_worker(monster_path):
+    """工作进程初始化：只加载一次模板"""
+    global _monster_data
+    utils.VISUALIZATION_MODE = False
+    _monster_data = simulate.load_monster_data(monster_path)
+
+
+def simulate_request(left_army, right_army, trials, seed):
+    """在工作进程中模拟一个请求，返回每局的结果"""
+    winners = []
+    for i in range(trials):
+        battlefield = Battlefield(_monster_data, seed=None if seed is None else seed + i)
+        if not battlefield.setup_battle(left_army, right_army, _monster_data):
+            return {"error": "阵容中有未知的怪物"}
+        winners.append(battlefield.run_battle().name)
+        battlefield.release_summons()
+    return {
+        "winners": winners,
+        "left_win_rate": winners.count("LEFT") / trials,
+    }
+
+
+class ResultCache:
+    """线程安全的 LRU 结果缓存"""
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+class SimulationService:
+    def __init__(self, monster_path=simulate.MONSTER_DATA_PATH, workers=None, cache_size=4096):
+        self.cache = ResultCache(cache_size)
+        # 不开进程池时在调用 submit 的线程里模拟。socket 模式下每个连接一个线程，
+        # 模拟会共用模块级的状态（对象池、全局 random），所以一次只跑一个
+        self.inline_lock = threading.Lock()
+        if workers == 0:
+            # 不开进程池，直接在当前进程模拟，延迟最低
+            _init_worker(monster_path)
+            self.pool = None
+        else:
+            self.pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(monster_path,))
+
+    def submit(self, line, callback):
+        """提交一行请求，完成后调用 callback(响应字典)"""
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            # 先取出 request_id，后面的字段出错时客户端也能对上号
+            request_id = request.get("request_id")
+            left_army = normalize_army(request["left"])
+            right_army = normalize_army(request["right"])
+            trials = int(request.get("trials", 1))
+            seed = request.get("seed")
+            if trials < 1:
+                raise ValueError(f"trials 必须至少为 1，收到 {trials}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            callback({"request_id": request_id, "error": f"无法解析请求：{e}"})
+            return
+        # 没有指定种子的请求每次都应该是新的随机样本，不缓存
+        key = None if seed is None else (canonical_matchup(left_army, right_army), trials, seed)
+
+        def finish(result, cached):
+            response = {"request_id": request_id, **result, "cached": cached,
+                        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+            callback(response)
+
+        def on_result(result):
+            if key is not None and "error" not in result:
+                self.cache.put(key, result)
+            finish(result, False)
+
+        def on_error(e):
+            finish({"error": repr(e)}, False)
+
+        result = None if key is None else self.cache.get(key)
+        if result is not None:
+            finish(result, True)
+        elif self.pool is None:
+            try:
+                with self.inline_lock:
+                    result = simulate_request(left_army, right_army, trials, seed)
+            except Exception as e:
+                on_error(e)
+            else:
+                on_result(result)
+        else:
+            self.pool.apply_async(simulate_request, (left_army, right_army, trials, seed),
+                                  callback=on_result, error_callback=on_error)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+class _PendingCounter:
+    """统计一个输入流还有多少请求没有完成"""
+    def __init__(self):
+        self.count = 0
+        self.done = threading.Condition()
+
+    def add(self):
+        with self.done:
+            self.count += 1
+
+    def finish(self):
+        with self.done:
+            self.count -= 1
+            self.done.notify_all()
+
+    def wait(self):
+        with self.done:
+            self.done.wait_for(lambda: self.count == 0)
+
+
+def serve_stream(service, reader, writer):
+    """从 reader 逐行读请求，结果按完成顺序写入 writer"""
+    lock = threading.Lock()
+    pending = _PendingCounter()
+
+    def respond(response):
+        data = json.dumps(response, ensure_ascii=False) + "\n"
+        with lock:
+            writer.write(data)
+            writer.flush()
+        pending.finish()
+
+    for line in reader:
+        if not line.strip():
+            continue
+        pending.add()
+        service.submit(line, respond)
+    pending.wait()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = (line.decode('utf-8') for line in self.rfile)
+        writer = _TextWriter(self.wfile)
+        serve_stream(self.server.service, reader, writer)
+
+
+class _TextWriter:
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="常驻模拟服务，按行读取 JSON 请求")
+    parser.add_argument("--socket", help="监听的 Unix socket 路径，不指定则使用 stdin/stdout")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="工作进程数，0 表示在主进程中逐个模拟（socket 的多个连接也会排队）")
+    parser.add_argument("--cache-size", type=int, default=4096, help="LRU 缓存的条数")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    service = SimulationService(args.monsters, args.workers, args.cache_size)
+    try:
+        if args.socket:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            with socketserver.ThreadingUnixStreamServer(args.socket, _Handler) as server:
+                server.service = service
+                server.serve_forever()
+        else:
+            serve_stream(service, sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
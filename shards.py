@@ -0,0 +1,230 @@
+"""
+分片评估
+
+一台机器跑不完整个数据集时，用 --shard i/N 把行按对局的规范化表示（canonical_matchup）的哈希分成 N 份，
+同样的阵容总落在同一个分片里，分片方式与机器、行顺序无关。每个分片写一个自描述的部分结果文件：
+数据集和分片信息、引擎指纹（引擎代码 + 所有怪物的模板和子类源码）、模拟配置、每行的对局和预测结果、
+统计和耗时。merge 检查所有分片的指纹和配置一致、分片齐全，再按原始行号把结果重放进 EvaluationReporter，
+得到和单机跑完整个数据集相同的报告和 errors.json。
+
+指定 --seed 时每行的种子由基础种子和阵容决定，分片与否结果都完全一样；不指定时与 simulate.main 相同，不固定种子。
+
+用法（在包的上一级目录，共享文件系统上的任意机器）：
+    python -m arknight.shards run arknight/arknights.csv --shard 0/4 --out parts/0.json --seed 0
+    python -m arknight.shards merge parts/*.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+from collections import Counter
+
+from . import simulate, utils
+from .battle_field import Battlefield
+from .utils import Faction, canonical_matchup
+
+PARTIAL_VERSION = 2
+
+
+def matchup_hash(scene_config):
+    key = canonical_matchup(scene_config["left"], scene_config["right"])
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def parse_shard(text):
+    """"i/N" -> (i, N)"""
+    index, count = (int(part) for part in text.split("/"))
+    if not 0 <= index < count:
+        raise ValueError(f"分片 {text} 超出范围")
+    return index, count
+
+
+def shard_rows(battle_data, index, count):
+    return [row for row, scene_config in enumerate(battle_data) if matchup_hash(scene_config) % count == index]
+
+
+def fingerprint(monster_data):
+    """引擎代码和怪物模板的指纹，不同分片必须一致才能合并"""
+    from .incremental import engine_fingerprint, monster_fingerprints
+
+    h = hashlib.sha1(engine_fingerprint().encode('utf-8'))
+    h.update(json.dumps(monster_fingerprints(monster_data), sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def unknown_monsters(monster_data, scene_config):
+    known = {m["名字"] for m in monster_data}
+    return sorted(name for name in list(scene_config["left"]) + list(scene_config["right"]) if name not in known)
+
+
+def predict(monster_data, scene_config, trials, seed):
+    """seed 为 None 时与 simulate.predict_left_win 相同；否则用由阵容决定的种子跑 trials 局，多数获胜"""
+    if seed is None:
+        return simulate.predict_left_win(monster_data, scene_config["left"], scene_config["right"])
+    base = (matchup_hash(scene_config) + seed * 1000003) % (1 << 63)
+    wins = 0
+    for i in range(trials):
+        battlefield = Battlefield(monster_data, seed=base + i)
+        if not battlefield.setup_battle(scene_config["left"], scene_config["right"], monster_data):
+            raise ValueError(f"无法开始对局：{scene_config['left']} vs {scene_config['right']}")
+        wins += battlefield.run_battle() == Faction.LEFT
+        battlefield.release_summons()
+    return wins * 2 > trials
+
+
+def run_shard(csv_path, monster_path, index, count, trials=3, seed=None, limit=None):
+    """评估一个分片，返回部分结果（可以直接写成 JSON）"""
+    start = time.perf_counter()
+    monster_data = simulate.load_monster_data(monster_path)
+    battle_data = simulate.process_battle_data(csv_path)
+    if limit:
+        battle_data = battle_data[:limit]
+    rows = []
+    confusion = Counter()
+    correct = 0
+    invalid = 0
+    for row in shard_rows(battle_data, index, count):
+        scene_config = battle_data[row]
+        unknown = unknown_monsters(monster_data, scene_config)
+        if unknown:
+            # 模拟不了的行单独标记，不计入正确率
+            invalid += 1
+            rows.append({"row": row, **scene_config, "left_win": None, "invalid": f"未知的怪物：{', '.join(unknown)}"})
+            continue
+        left_win = predict(monster_data, scene_config, trials, seed)
+        predicted = "left" if left_win else "right"
+        confusion[f"{scene_config['result']}/{predicted}"] += 1
+        correct += scene_config["result"] == predicted
+        rows.append({"row": row, **scene_config, "left_win": left_win})
+    return {
+        "version": PARTIAL_VERSION,
+        # 路径只用于显示，各台机器挂载共享存储的位置可能不同，合并时只比较内容
+        "dataset": {"path": os.path.abspath(csv_path), "sha256": file_digest(csv_path),
+                    "rows": len(battle_data)},
+        "shard": [index, count],
+        "engine": fingerprint(monster_data),
+        "config": {"trials": trials, "seed": seed, "limit": limit},
+        "counts": {"matches": len(rows) - invalid, "correct": correct, "invalid": invalid,
+                   "confusion": dict(confusion)},
+        "timing": {"elapsed": time.perf_counter() - start, "host": socket.gethostname(),
+                   "finished": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "rows": rows,
+    }
+
+
+def _dataset_identity(dataset):
+    return dataset["sha256"], dataset["rows"]
+
+
+def load_partials(paths):
+    """读取并检查部分结果，返回按分片号排好的列表"""
+    partials = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            partial = json.load(f)
+        if partial.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"{path}：不支持的版本 {partial.get('version')}")
+        partials.append(partial)
+    if not partials:
+        raise ValueError("没有部分结果")
+
+    first = partials[0]
+    for partial in partials[1:]:
+        if _dataset_identity(partial["dataset"]) != _dataset_identity(first["dataset"]):
+            raise ValueError(f"分片 {partial['shard']} 与分片 {first['shard']} 的数据集不一致")
+        for field in ("engine", "config"):
+            if partial[field] != first[field]:
+                raise ValueError(f"分片 {partial['shard']} 与分片 {first['shard']} 的 {field} 不一致")
+    count = first["shard"][1]
+    seen = Counter(partial["shard"][0] for partial in partials)
+    if any(partial["shard"][1] != count for partial in partials):
+        raise ValueError("分片总数不一致")
+    missing = sorted(set(range(count)) - set(seen))
+    duplicated = sorted(i for i, n in seen.items() if n > 1)
+    if missing or duplicated:
+        raise ValueError(f"分片不完整：缺少 {missing}，重复 {duplicated}")
+    for partial in partials:
+        if partial["counts"]["matches"] + partial["counts"]["invalid"] != len(partial["rows"]):
+            raise ValueError(f"分片 {partial['shard']} 的行数与统计不一致")
+    return sorted(partials, key=lambda partial: partial["shard"][0])
+
+
+def merge(partials, reporter):
+    """按原始行号把所有分片的结果重放进 reporter，返回 (reporter, 无法模拟的行数)"""
+    rows = sorted((row for partial in partials for row in partial["rows"]), key=lambda row: row["row"])
+    expected = partials[0]["dataset"]["rows"]
+    if len(rows) != expected:
+        raise ValueError(f"合并后有 {len(rows)} 行，数据集有 {expected} 行")
+    invalid = 0
+    for row in rows:
+        if row.get("invalid"):
+            invalid += 1
+            continue
+        scene_config = {"left": row["left"], "right": row["right"], "result": row["result"]}
+        reporter.record(scene_config, row["left_win"])
+    reporter.close()
+    return reporter, invalid
+
+
+def main(argv=None):
+    from .reporter import EvaluationReporter
+
+    parser = argparse.ArgumentParser(description="分片评估数据集并合并部分结果")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="评估一个分片")
+    p_run.add_argument("csv", help="对局数据集")
+    p_run.add_argument("--shard", default="0/1", help="i/N：评估 N 个分片中的第 i 个")
+    p_run.add_argument("--out", required=True, help="部分结果文件")
+    p_run.add_argument("--trials", type=int, default=3, help="指定 --seed 时每行模拟的局数")
+    p_run.add_argument("--seed", type=int, default=None, help="基础种子，不指定则与 simulate.main 一样随机")
+    p_run.add_argument("--limit", type=int, default=None, help="只使用前多少个对局")
+    p_run.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+
+    p_merge = sub.add_parser("merge", help="合并所有分片，输出完整报告")
+    p_merge.add_argument("partials", nargs="+", help="部分结果文件")
+    p_merge.add_argument("--errors", default="errors.json", help="误判输出文件")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    if args.command == "run":
+        try:
+            index, count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        partial = run_shard(args.csv, args.monsters, index, count, args.trials, args.seed, args.limit)
+        tmp = f"{args.out}.tmp"
+        with open(tmp, encoding='utf-8', mode='w') as f:
+            json.dump(partial, f, ensure_ascii=False)
+        os.replace(tmp, args.out)
+        counts = partial["counts"]
+        print(f"分片 {index}/{count}：{counts['matches']} 行，正确 {counts['correct']}，无法模拟 {counts['invalid']} 行，"
+              f"耗时 {partial['timing']['elapsed']:.1f}s")
+    else:
+        try:
+            partials = load_partials(args.partials)
+            total = partials[0]["dataset"]["rows"] - sum(p["counts"]["invalid"] for p in partials)
+            reporter, invalid = merge(partials, EvaluationReporter(total=total, error_path=args.errors))
+        except ValueError as e:
+            parser.error(str(e))
+        print(reporter.summary())
+        if invalid:
+            print(f"{invalid} 行包含未知的怪物，没有计入正确率")
+        for partial in partials:
+            print(f"分片 {partial['shard'][0]}/{partial['shard'][1]}：{partial['counts']['matches']} 行，"
+                  f"{partial['timing']['host']} 耗时 {partial['timing']['elapsed']:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
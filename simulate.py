@@ -1,22 +1,27 @@
 import json
 import math
+import os
 import random
 import time
 from enum import Enum
-import numpy as np
-import pandas as pd
-from tqdm import tqdm
 
 from .battle_field import Battlefield, Faction
+from .reporter import EvaluationReporter
+from .templates import load_templates
 
 from .utils import MONSTER_MAPPING, VISUALIZATION_MODE
 
+MONSTER_DATA_PATH = os.path.join(os.path.dirname(__file__), "monsters.json")
+
 
 def process_battle_data(csv_path):
     """
     处理战斗数据CSV文件
     :param csv_path: 输入CSV文件路径
     """
+    # pandas 导入很慢，只在需要读数据集时导入
+    import pandas as pd
+
     # 读取CSV文件（假设没有表头）
     df = pd.read_csv(csv_path, header=1)
     
@@ -25,9 +30,9 @@ def process_battle_data(csv_path):
     
     for _, row in df.iterrows():
         # 分解左右阵营数据
-        left_data = row[0:56]    # 1-56列 (0-based索引0-55)
-        right_data = row[56:112]  # 56-112列 (0-based索引56-111)
-        winner = row[112]         # 69列 (0-based索引112)
+        left_data = row.iloc[0:56]    # 1-56列 (0-based索引0-55)
+        right_data = row.iloc[56:112]  # 56-112列 (0-based索引56-111)
+        winner = row.iloc[112]         # 69列 (0-based索引112)
         
         # 构建阵营字典（ID从1开始）
         left_army = {MONSTER_MAPPING[i]: int(count) for i, count in enumerate(left_data) if count > 0}
@@ -44,11 +49,37 @@ def process_battle_data(csv_path):
     
     return battle_records
 
+def load_monster_data(path=MONSTER_DATA_PATH):
+    """加载怪物模板，解析结果按 monsters.json 的修改时间和内容缓存，见 templates.py"""
+    return load_templates(path)
+
+
+def predict_left_win(monster_data, left_army, right_army, visualize=False, outcomes=None):
+    """三局两胜，返回左边是否获胜；给出 outcomes（Counter）时把每局的结局计入其中"""
+    leftWins = 0
+    for i in range(3):
+        battlefield = Battlefield(monster_data)
+        if not battlefield.setup_battle(left_army, right_army, monster_data):
+            continue
+
+        # 开始战斗
+        outcome = battlefield.run_battle(visualize=visualize)
+        battlefield.release_summons()
+        if outcomes is not None:
+            outcomes[outcome] += 1
+        if outcome == Faction.LEFT:
+            leftWins += 1
+        if leftWins >= 2:
+            break
+        if i >= 1 and leftWins == 0:
+            break
+    return leftWins >= 2
+
+
 def main():
     """主函数"""
     # 加载怪物数据
-    with open("arknight/monsters.json", encoding='utf-8') as f:
-        monster_data = json.load(f)["monsters"]
+    monster_data = load_monster_data()
     
     # with open("scene.json", encoding='utf-8') as f:
     #     scene_config = json.load(f)
@@ -56,10 +87,8 @@ def main():
     # 使用示例，直接修改这里的csv文件就可以跑模拟
     battle_data = process_battle_data("arknight/56fin2_66k.csv")
 
-    
-    win = 0
-    matches = 0
-    for scene_config in tqdm(battle_data):
+    reporter = EvaluationReporter(total=len(battle_data))
+    for scene_config in battle_data:
         if VISUALIZATION_MODE:
             scene_config = {"left": {"宿主流浪者": 7, "污染躯壳": 14, "凋零萨卡兹": 5}, "right": {"大喷蛛": 4, "杰斯顿": 1, "衣架": 10}, "result": "right"}
 
@@ -71,35 +100,15 @@ def main():
         right_army = scene_config["right"]
     
         # 初始化战场
-        leftWins = 0
-        for i in range(3):
-            battlefield = Battlefield(monster_data)
-            if not battlefield.setup_battle(left_army, right_army, monster_data):
-                continue
-            
-            # 开始战斗
-            if battlefield.run_battle(visualize=VISUALIZATION_MODE) == Faction.LEFT:
-                leftWins += 1
-            if leftWins >= 2:
-                break
-            if i >= 1 and leftWins == 0:
-                break
-
-        left_win = leftWins >= 2
-        
-        if (left_win and scene_config["result"] == "left") or (not left_win and scene_config["result"] == "right"):
-            win += 1
-        else:
-            with open("errors.json", encoding='utf-8', mode='+a') as f:
-                f.write(json.dumps(scene_config, ensure_ascii=False))
-                f.write('\n')
-        
-
-        matches += 1
-        print(f"当前胜率：{win} / {matches}")
+        left_win = predict_left_win(monster_data, left_army, right_army, visualize=VISUALIZATION_MODE,
+                                    outcomes=reporter.outcomes)
+        reporter.record(scene_config, left_win)
         if VISUALIZATION_MODE:
             break
 
+    reporter.close()
+    print(reporter.summary())
+
 
 if __name__ == "__main__":
     # import cProfile
@@ -0,0 +1,153 @@
+"""
+战场快照
+
+copy.deepcopy 对每个对象都要走一遍 __reduce_ex__ 协议，复制一整个战场非常慢。
+这里按类型分派做一次浅层逐字段的复制：所有单位、buff、元素爆条、射弹和场地效果都会被复制，
+只读的模板数据（monster_data）在快照之间共享，exclude 中列出的属性不复制。
+"""
+import random
+import types
+from collections import defaultdict
+from enum import Enum
+
+import numpy as np
+
+from .vector2d import FastVector
+
+
+def _atomic(obj, memo):
+    return obj
+
+
+def _clone_vector(obj, memo):
+    v = FastVector(obj.x, obj.y)
+    memo[id(obj)] = v
+    return v
+
+
+def _clone_list(obj, memo):
+    result = []
+    memo[id(obj)] = result
+    result.extend([clone(x, memo) for x in obj])
+    return result
+
+
+def _clone_tuple(obj, memo):
+    return tuple([clone(x, memo) for x in obj])
+
+
+def _clone_dict(obj, memo):
+    result = {}
+    memo[id(obj)] = result
+    for k, v in obj.items():
+        result[clone(k, memo)] = clone(v, memo)
+    return result
+
+
+def _clone_defaultdict(obj, memo):
+    result = defaultdict(obj.default_factory)
+    memo[id(obj)] = result
+    for k, v in obj.items():
+        result[clone(k, memo)] = clone(v, memo)
+    return result
+
+
+def _clone_set(obj, memo):
+    result = set()
+    memo[id(obj)] = result
+    result.update([clone(x, memo) for x in obj])
+    return result
+
+
+def _clone_ndarray(obj, memo):
+    result = obj.copy()
+    memo[id(obj)] = result
+    return result
+
+
+def _clone_method(obj, memo):
+    return types.MethodType(obj.__func__, clone(obj.__self__, memo))
+
+
+def _clone_random(obj, memo):
+    result = random.Random()
+    result.setstate(obj.getstate())
+    memo[id(obj)] = result
+    return result
+
+
+def _clone_object(obj, memo):
+    cls = obj.__class__
+    result = cls.__new__(cls)
+    memo[id(obj)] = result
+    state = getattr(obj, "__dict__", None)
+    if state is not None:
+        result.__dict__.update({k: clone(v, memo) for k, v in state.items()})
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get("__slots__", ()):
+            if name != "__dict__" and hasattr(obj, name):
+                setattr(result, name, clone(getattr(obj, name), memo))
+    return result
+
+
+_dispatch = {
+    int: _atomic,
+    float: _atomic,
+    bool: _atomic,
+    str: _atomic,
+    bytes: _atomic,
+    type(None): _atomic,
+    type: _atomic,
+    types.FunctionType: _atomic,
+    types.BuiltinFunctionType: _atomic,
+    types.ModuleType: _atomic,
+    FastVector: _clone_vector,
+    list: _clone_list,
+    tuple: _clone_tuple,
+    dict: _clone_dict,
+    defaultdict: _clone_defaultdict,
+    set: _clone_set,
+    np.ndarray: _clone_ndarray,
+    types.MethodType: _clone_method,
+    random.Random: _clone_random,
+}
+
+
+def _resolve(cls):
+    """为没见过的类型选择复制方式"""
+    if issubclass(cls, (Enum, np.generic)):
+        handler = _atomic
+    else:
+        handler = _clone_object
+    _dispatch[cls] = handler
+    return handler
+
+
+def clone(obj, memo):
+    """复制对象图，memo 记录 id(原对象) -> 新对象"""
+    hit = memo.get(id(obj))
+    if hit is not None:
+        return hit
+    handler = _dispatch.get(obj.__class__)
+    if handler is None:
+        handler = _resolve(obj.__class__)
+    return handler(obj, memo)
+
+
+class BattleSnapshot:
+    """某一帧的完整战场状态，可以多次用来恢复或分叉"""
+    def __init__(self, state, round, gameTime):
+        self.state = state
+        self.round = round
+        self.gameTime = gameTime
+
+
+def copy_battlefield(source, target, shared=(), exclude=()):
+    """把 source 的状态复制到 target 上，内部对 source 的引用都会指向 target；
+    exclude 中的属性不复制，由调用方自己设置"""
+    memo = {id(source): target}
+    for obj in shared:
+        memo[id(obj)] = obj
+    state = {k: v for k, v in source.__dict__.items() if k not in exclude}
+    target.__dict__.update(clone(state, memo))
+    return target
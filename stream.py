@@ -0,0 +1,207 @@
+"""
+流式 JSONL 批处理
+
+上游流水线不断产生对局请求（每行一个 JSON，格式同 server.py）。这里逐行读取请求，进程池里最多同时有
+max_in_flight 个请求，满了就暂停读取输入（背压），所以内存占用与输入长度无关。每个请求一完成就写出
+一行结果，带上 request_id 和输入行号。结果按完成顺序写出，不按输入顺序。
+
+断点续跑：输出文件旁边的 .checkpoint 记录一条水位线，水位线之前的输入行都已经写出了结果，同时记录水位线那一行
+提交时输出文件的长度。重新运行时从水位线处继续读输入，并扫描输出文件中该长度之后的结果，跳过已经完成的行；
+崩溃时写了一半的最后一行会被截掉。输入文件后来追加了内容时，再运行一次只处理新增的行。
+
+用法（在包的上一级目录）：
+    python -m arknight.stream requests.jsonl results.jsonl --workers 4 --max-in-flight 32
+    producer | python -m arknight.stream - results.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from . import simulate, utils
+from .server import SimulationService
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(output_path):
+    return f"{output_path}.checkpoint"
+
+
+def load_checkpoint(output_path):
+    try:
+        with open(checkpoint_path(output_path), encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != CHECKPOINT_VERSION:
+        return None
+    return state
+
+
+def save_checkpoint(output_path, state):
+    target = checkpoint_path(output_path)
+    tmp = f"{target}.tmp"
+    with open(tmp, "w", encoding='utf-8') as f:
+        json.dump({"version": CHECKPOINT_VERSION, **state}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+
+def recover_output(output_path, offset, first_line):
+    """截掉输出末尾写了一半的行，返回 (截断后的长度, offset 之后已经完成、行号不小于 first_line 的输入行)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return 0, done
+    with open(output_path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        end = min(offset, f.tell())
+        f.seek(end)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                line = json.loads(raw)["line"]
+            except (ValueError, KeyError, TypeError):
+                break
+            if line >= first_line:
+                done.add(line)
+            end += len(raw)
+        f.truncate(end)
+    return end, done
+
+
+class StreamJob:
+    def __init__(self, service, max_in_flight=32, checkpoint_every=50):
+        self.service = service
+        self.max_in_flight = max_in_flight
+        self.checkpoint_every = checkpoint_every
+        self.changed = threading.Condition()
+        # 已提交未完成的输入行：行号 -> (该行在输入中的偏移, 提交时输出文件的长度)，按行号递增
+        self.pending = OrderedDict()
+        self.next_line = 0
+        self.next_offset = 0
+        self.output_size = 0
+        # 续跑时扫描输出的起点，以及扫描到的已完成的最大行号：
+        # 这一行之前提交的请求，检查点里的输出长度不能超过扫描起点，否则再次续跑时会漏掉这些已完成的行
+        self.rescan_offset = 0
+        self.rescan_until = -1
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+
+    def _output_mark(self, line):
+        return self.rescan_offset if line < self.rescan_until else self.output_size
+
+    def watermark(self):
+        """(行号, 输入偏移, 输出长度)：这一行之前的输入都已经写出结果"""
+        if self.pending:
+            line, (offset, output_size) = next(iter(self.pending.items()))
+            return line, offset, output_size
+        return self.next_line, self.next_offset, self._output_mark(self.next_line)
+
+    def _checkpoint(self):
+        if self.output_path is None:
+            return
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        line, offset, output_size = self.watermark()
+        save_checkpoint(self.output_path, {"input": self.input_name, "line": line, "offset": offset,
+                                           "output_offset": output_size})
+
+    def _respond(self, line, response):
+        data = json.dumps({"request_id": response.pop("request_id", None), "line": line, **response},
+                          ensure_ascii=False) + "\n"
+        with self.changed:
+            self.writer.write(data.encode('utf-8'))
+            self.writer.flush()
+            self.output_size += len(data.encode('utf-8'))
+            del self.pending[line]
+            self.completed += 1
+            if self.completed % self.checkpoint_every == 0:
+                self._checkpoint()
+            self.changed.notify_all()
+
+    def _open(self, input_path, output_path):
+        done = set()
+        start_line, start_offset = 0, 0
+        if output_path is not None:
+            state = load_checkpoint(output_path)
+            if state is not None:
+                if state["input"] != self.input_name:
+                    raise ValueError(f"{checkpoint_path(output_path)} 属于另一个输入：{state['input']}")
+                start_line, start_offset = state["line"], state["offset"]
+                self.output_size, done = recover_output(output_path, state["output_offset"], start_line)
+                self.rescan_offset = min(state["output_offset"], self.output_size)
+                self.rescan_until = max(done, default=-1)
+            elif os.path.exists(output_path):
+                raise ValueError(f"{output_path} 已存在但没有检查点，请先删除")
+            self.writer = open(output_path, "ab")
+        else:
+            self.writer = sys.stdout.buffer
+
+        reader = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+        if start_offset and reader.seekable():
+            reader.seek(start_offset)
+            self.next_line, self.next_offset = start_line, start_offset
+        return reader, done, start_line
+
+    def run(self, input_path, output_path=None):
+        """处理 input_path（"-" 表示 stdin）中的所有请求，结果追加到 output_path（None 表示 stdout）"""
+        self.input_name = input_path if input_path == "-" else os.path.abspath(input_path)
+        self.output_path = output_path
+        reader, done, start_line = self._open(input_path, output_path)
+        try:
+            for raw in reader:
+                line, offset = self.next_line, self.next_offset
+                # 不能 seek 的输入（stdin）续跑时按行号跳过水位线之前的行
+                skip = line < start_line or line in done or not raw.strip()
+                if not skip:
+                    with self.changed:
+                        self.changed.wait_for(lambda: len(self.pending) < self.max_in_flight)
+                        self.pending[line] = (offset, self._output_mark(line))
+                with self.changed:
+                    self.next_line, self.next_offset = line + 1, offset + len(raw)
+                if skip:
+                    self.skipped += line in done
+                    continue
+                self.submitted += 1
+                self.service.submit(raw.decode('utf-8', errors='replace'),
+                                    lambda response, line=line: self._respond(line, response))
+            with self.changed:
+                self.changed.wait_for(lambda: not self.pending)
+                self._checkpoint()
+        finally:
+            if reader is not sys.stdin.buffer:
+                reader.close()
+            if self.writer is not sys.stdout.buffer:
+                self.writer.close()
+        return {"submitted": self.submitted, "completed": self.completed, "skipped": self.skipped}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="流式处理 JSONL 对局请求，支持断点续跑")
+    parser.add_argument("input", help="请求文件，- 表示 stdin")
+    parser.add_argument("output", nargs="?", help="结果文件（追加写入，旁边保存检查点），不指定则写到 stdout 且不能续跑")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，0 表示在主进程中模拟")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="同时在进程池中的最多请求数")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="每完成多少个请求保存一次检查点")
+    parser.add_argument("--monsters", default=simulate.MONSTER_DATA_PATH, help="怪物模板文件")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    service = SimulationService(args.monsters, args.workers)
+    try:
+        stats = StreamJob(service, args.max_in_flight, args.checkpoint_every).run(args.input, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        service.close()
+    print(f"提交 {stats['submitted']}，完成 {stats['completed']}，续跑时跳过 {stats['skipped']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
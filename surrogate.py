@@ -0,0 +1,253 @@
+"""
+胜负代理模型
+
+很多查询只需要一个快速的估计。这里用纯 NumPy 在两边的怪物数量向量（各 58 维）上训练一个小 MLP
+（hidden=0 时退化为逻辑回归），训练数据来自带标签的 CSV 和模拟结果（incremental.py 保存的存档）。
+模型输出经过温度缩放校准的左边胜率，不确定度为 min(p, 1-p)；
+HybridPredictor 在不确定度超过阈值时自动回退到真正的 Battlefield 模拟。
+
+用法（在包的上一级目录）：
+    python -m arknight.surrogate train arknight/arknights53.csv --store arknight/incremental_store.json --out surrogate.npz
+    python -m arknight.surrogate evaluate surrogate.npz arknight/arknights53.csv
+"""
+import argparse
+import json
+import math
+import sys
+
+import numpy as np
+
+from . import simulate, utils
+from .utils import MONSTER_MAPPING, REVERSE_MONSTER_MAPPING
+
+MODEL_VERSION = 1
+NUM_TYPES = len(MONSTER_MAPPING)
+
+
+def encode(left_army, right_army):
+    """把对局编码成特征向量：两边数量的 log1p"""
+    x = np.zeros(2 * NUM_TYPES, dtype=np.float64)
+    for offset, army in ((0, left_army), (NUM_TYPES, right_army)):
+        for name, count in army.items():
+            x[offset + REVERSE_MONSTER_MAPPING[name]] = math.log1p(count)
+    return x
+
+
+def build_dataset(records):
+    """records: [(left, right, left_win)]，同时加入左右交换后的样本"""
+    xs, ys = [], []
+    for left, right, left_win in records:
+        if any(name not in REVERSE_MONSTER_MAPPING for name in list(left) + list(right)):
+            continue
+        xs.append(encode(left, right))
+        ys.append(1.0 if left_win else 0.0)
+        xs.append(encode(right, left))
+        ys.append(0.0 if left_win else 1.0)
+    return np.array(xs).reshape(-1, 2 * NUM_TYPES), np.array(ys)
+
+
+def csv_records(csv_path):
+    return [(r["left"], r["right"], r["result"] == "left") for r in simulate.process_battle_data(csv_path)]
+
+
+def store_records(store_path):
+    """incremental.py 存档里的模拟结果"""
+    with open(store_path, encoding='utf-8') as f:
+        outcomes = json.load(f)["outcomes"]
+    records = []
+    for key, left_win in outcomes.items():
+        left, right = json.loads(key)
+        records.append((dict(left), dict(right), left_win))
+    return records
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class SurrogateModel:
+    def __init__(self, hidden=32, seed=0):
+        rng = np.random.default_rng(seed)
+        d = 2 * NUM_TYPES
+        self.hidden = hidden
+        self.temperature = 1.0
+        if hidden:
+            self.params = {
+                "W1": rng.normal(0, 1 / math.sqrt(d), (d, hidden)),
+                "b1": np.zeros(hidden),
+                "W2": rng.normal(0, 1 / math.sqrt(hidden), hidden),
+                "b2": np.zeros(1),
+            }
+        else:
+            self.params = {"W2": np.zeros(d), "b2": np.zeros(1)}
+
+    def logits(self, x):
+        p = self.params
+        h = np.tanh(x @ p["W1"] + p["b1"]) if self.hidden else x
+        return h @ p["W2"] + p["b2"][0]
+
+    def predict_proba(self, x):
+        """左边获胜的校准概率"""
+        return _sigmoid(self.logits(x) / self.temperature)
+
+    def _gradients(self, x, y, l2):
+        p = self.params
+        if self.hidden:
+            h = np.tanh(x @ p["W1"] + p["b1"])
+        else:
+            h = x
+        err = (_sigmoid(h @ p["W2"] + p["b2"][0]) - y) / len(y)
+        grads = {"W2": h.T @ err + l2 * p["W2"], "b2": np.array([err.sum()])}
+        if self.hidden:
+            dh = np.outer(err, p["W2"]) * (1 - h * h)
+            grads["W1"] = x.T @ dh + l2 * p["W1"]
+            grads["b1"] = dh.sum(axis=0)
+        return grads
+
+    def fit(self, x, y, epochs=500, lr=0.01, l2=1e-4):
+        """全批量 Adam"""
+        m = {k: np.zeros_like(v) for k, v in self.params.items()}
+        v = {k: np.zeros_like(v) for k, v in self.params.items()}
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for t in range(1, epochs + 1):
+            for k, g in self._gradients(x, y, l2).items():
+                m[k] = beta1 * m[k] + (1 - beta1) * g
+                v[k] = beta2 * v[k] + (1 - beta2) * g * g
+                self.params[k] -= lr * (m[k] / (1 - beta1 ** t)) / (np.sqrt(v[k] / (1 - beta2 ** t)) + eps)
+        return self
+
+    def calibrate(self, x, y):
+        """在验证集上用网格搜索选择使对数损失最小的温度"""
+        z = self.logits(x)
+        best = (math.inf, 1.0)
+        for temperature in np.exp(np.linspace(math.log(0.25), math.log(8), 60)):
+            best = min(best, (log_loss(_sigmoid(z / temperature), y), temperature))
+        self.temperature = float(best[1])
+        return self.temperature
+
+    def save(self, path):
+        np.savez(path, version=MODEL_VERSION, hidden=self.hidden, temperature=self.temperature,
+                 names=np.array([MONSTER_MAPPING[i] for i in range(NUM_TYPES)]), **self.params)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != MODEL_VERSION:
+                raise ValueError(f"模型版本 {int(data['version'])} 与当前版本 {MODEL_VERSION} 不兼容")
+            if list(data["names"]) != [MONSTER_MAPPING[i] for i in range(NUM_TYPES)]:
+                raise ValueError("模型训练时的 MONSTER_MAPPING 与当前不一致")
+            model = cls(hidden=int(data["hidden"]))
+            model.temperature = float(data["temperature"])
+            model.params = {k: data[k] for k in model.params}
+        return model
+
+
+def uncertainty(p):
+    return np.minimum(p, 1 - p)
+
+
+def log_loss(p, y):
+    p = np.clip(p, 1e-7, 1 - 1e-7)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def expected_calibration_error(p, y, bins=10):
+    edges = np.minimum((p * bins).astype(int), bins - 1)
+    ece = 0.0
+    for b in range(bins):
+        mask = edges == b
+        if mask.any():
+            ece += mask.mean() * abs(p[mask].mean() - y[mask].mean())
+    return float(ece)
+
+
+class HybridPredictor:
+    """代理模型足够确定时直接回答，否则回退到模拟"""
+    def __init__(self, model, monster_data, threshold=0.2):
+        self.model = model
+        self.monster_data = monster_data
+        self.threshold = threshold
+        self.surrogate_count = 0
+        self.simulated_count = 0
+
+    def predict(self, left_army, right_army):
+        """返回 (左边是否获胜, 是否来自模拟)"""
+        left_army = utils.normalize_army(left_army)
+        right_army = utils.normalize_army(right_army)
+        if all(name in REVERSE_MONSTER_MAPPING for name in list(left_army) + list(right_army)):
+            p = float(self.model.predict_proba(encode(left_army, right_army)))
+            if uncertainty(p) <= self.threshold:
+                self.surrogate_count += 1
+                return p >= 0.5, False
+        self.simulated_count += 1
+        return simulate.predict_left_win(self.monster_data, left_army, right_army), True
+
+
+def train(records, hidden=32, epochs=500, lr=0.01, l2=1e-4, seed=0, validation=0.2):
+    """按对局划分训练集和验证集（交换样本跟随原样本），在验证集上校准温度"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(records))
+    n_val = int(len(records) * validation)
+    val_records = [records[i] for i in order[:n_val]]
+    train_records = [records[i] for i in order[n_val:]]
+
+    x, y = build_dataset(train_records)
+    model = SurrogateModel(hidden, seed).fit(x, y, epochs, lr, l2)
+    if val_records:
+        model.calibrate(*build_dataset(val_records))
+    return model
+
+
+def evaluate(model, x, y, threshold=0.2):
+    p = model.predict_proba(x)
+    confident = uncertainty(p) <= threshold
+    return {
+        "samples": len(y),
+        "accuracy": float(np.mean((p >= 0.5) == (y == 1))),
+        "log_loss": log_loss(p, y),
+        "ece": expected_calibration_error(p, y),
+        "coverage": float(confident.mean()),
+        "confident_accuracy": float(np.mean((p[confident] >= 0.5) == (y[confident] == 1))) if confident.any() else math.nan,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="训练和评估胜负代理模型")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="训练模型")
+    p_train.add_argument("csv", nargs="*", help="带标签的对局数据集")
+    p_train.add_argument("--store", action="append", default=[], help="incremental.py 保存的模拟结果")
+    p_train.add_argument("--out", default="surrogate.npz")
+    p_train.add_argument("--hidden", type=int, default=32, help="隐藏层大小，0 表示逻辑回归")
+    p_train.add_argument("--epochs", type=int, default=500)
+    p_train.add_argument("--lr", type=float, default=0.01)
+    p_train.add_argument("--l2", type=float, default=1e-4)
+    p_train.add_argument("--seed", type=int, default=0)
+
+    p_eval = sub.add_parser("evaluate", help="在数据集上评估模型")
+    p_eval.add_argument("model")
+    p_eval.add_argument("csv", nargs="+")
+    p_eval.add_argument("--threshold", type=float, default=0.2, help="不确定度超过它时回退到模拟")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    if args.command == "train":
+        records = [r for path in args.csv for r in csv_records(path)]
+        records += [r for path in args.store for r in store_records(path)]
+        if not records:
+            parser.error("没有训练数据")
+        model = train(records, args.hidden, args.epochs, args.lr, args.l2, args.seed)
+        model.save(args.out)
+        x, y = build_dataset(records)
+        print(f"训练样本 {len(records)} 局，温度 {model.temperature:.3f}，已保存到 {args.out}")
+        print(json.dumps(evaluate(model, x, y), ensure_ascii=False))
+    else:
+        model = SurrogateModel.load(args.model)
+        records = [r for path in args.csv for r in csv_records(path)]
+        x, y = build_dataset(records)
+        print(json.dumps(evaluate(model, x, y, args.threshold), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
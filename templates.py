@@ -0,0 +1,77 @@
+"""
+怪物模板注册表
+
+每个工具启动时都要解析一遍 monsters.json。这里把解析结果缓存成 pickle（放在 __pycache__ 里），
+monsters.json 的修改时间和大小没变时直接读缓存；变了再比较内容的 sha256，内容也变了才重新解析。
+同一个进程里对同一个文件的重复加载返回同一个列表，伤害表等按模板缓存的结构也因此可以复用。
+"""
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_VERSION = 1
+
+# 绝对路径 -> (修改时间, 大小, 模板列表)
+_registry = {}
+
+
+def cache_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", f"{name}.templates-{CACHE_VERSION}.pickle")
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_cache(path):
+    try:
+        with open(cache_path(path), "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return None
+    return cache
+
+
+def _write_cache(path, cache):
+    target = cache_path(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError:
+        # 只读目录等情况下不缓存
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load_templates(path):
+    """返回 monsters.json 中的 "monsters" 列表，调用方不应修改它"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    entry = _registry.get(path)
+    if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        return entry[2]
+
+    cache = _read_cache(path)
+    if cache is not None and cache["mtime"] == st.st_mtime_ns and cache["size"] == st.st_size:
+        monsters = cache["monsters"]
+    else:
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = _digest(raw)
+        if cache is not None and cache["sha256"] == digest:
+            # 文件被 touch 过但内容没变
+            monsters = cache["monsters"]
+        else:
+            monsters = json.loads(raw.decode("utf-8"))["monsters"]
+        _write_cache(path, {"version": CACHE_VERSION, "mtime": st.st_mtime_ns, "size": st.st_size,
+                            "sha256": digest, "monsters": monsters})
+
+    _registry[path] = (st.st_mtime_ns, st.st_size, monsters)
+    return monsters
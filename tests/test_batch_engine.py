@@ -0,0 +1,45 @@
+"""批量引擎与单场 Battlefield 的胜率在统计上一致，并且和 Battlefield 一样会以平局结束"""
+import math
+
+from .. import simulate, utils
+from ..batch_engine import DRAW_OFFSET, BatchBattlefield
+from ..battle_field import Battlefield
+from ..utils import Draw, Faction
+
+LEFT, RIGHT = {"阿咬": 8}, {"狗pro": 6}
+
+
+def test_win_rate_matches_battlefield():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    n = 150
+    wins = 0
+    for seed in range(n):
+        battlefield = Battlefield(monster_data, seed=seed)
+        assert battlefield.setup_battle(LEFT, RIGHT, monster_data)
+        wins += battlefield.run_battle() == Faction.LEFT
+    batch = BatchBattlefield(monster_data, 600, seed=0, backend="numpy")
+    assert batch.setup_battle(LEFT, RIGHT)
+    batch.run_battle()
+
+    p, q = wins / n, batch.left_win_rate()
+    # 这个对局两边都有不小的胜率，差距超过 3 倍标准误说明两个引擎的规则不一致
+    assert 0.2 < p < 0.8
+    se = math.sqrt(p * (1 - p) / n + q * (1 - q) / batch.batch_size)
+    assert abs(p - q) <= 3 * se
+
+
+def test_timeout_and_stalemate_end_battles():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    batch = BatchBattlefield(monster_data, 8, seed=0, backend="numpy", max_game_time=5)
+    assert batch.setup_battle(LEFT, RIGHT)
+    batch.run_battle()
+    assert set(batch.outcomes()) == {Draw.TIMEOUT}
+    assert (batch.winners == DRAW_OFFSET + Draw.TIMEOUT.value).all()
+
+    batch = BatchBattlefield(monster_data, 8, seed=0, backend="numpy", stalemate_time=0.05)
+    assert batch.setup_battle(LEFT, RIGHT)
+    batch.run_battle()
+    assert set(batch.outcomes()) == {Draw.STALEMATE}
+    assert batch.left_win_rate() == 0.0
@@ -0,0 +1,19 @@
+"""接敌前快进与逐帧模拟在相同种子下的胜负、结束帧和剩余生命值应当基本一致"""
+import os
+
+from .. import simulate, utils
+from ..fast_forward import check_equivalence
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "arknights53.csv")
+
+
+def test_fast_forward_matches_full_simulation():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scenes = simulate.process_battle_data(CSV_PATH)[:4]
+    r = check_equivalence(monster_data, scenes, seeds=3)
+    assert r["battles"] == 12
+    assert r["frames_skipped"] > 0
+    assert r["agree"] >= 11
+    assert r["round_diff"] <= 0.1 * r["frames"]
+    assert r["health_diff"] <= 0.2 * r["health_full"]
@@ -0,0 +1,69 @@
+"""NumPy 和 Numba 内核在相同输入和相同种子的批量对局上必须逐位一致"""
+import os
+
+import numpy as np
+import pytest
+
+from .. import simulate, utils
+from ..batch_engine import BatchBattlefield
+from ..kernels import available_backends, get_kernels
+
+pytestmark = pytest.mark.skipif("numba" not in available_backends(), reason="没有安装 numba")
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "arknights53.csv")
+
+
+def _random_state(rng, B=4, N=12):
+    position = rng.uniform(-0.5, [13.5, 9.5], size=(B, N, 2))
+    velocity = rng.normal(0, 1.5, size=(B, N, 2))
+    alive = rng.random((B, N)) < 0.7
+    faction = np.arange(N) % 2
+    return position, velocity, alive, faction
+
+
+def test_kernels_match_on_random_state():
+    rng = np.random.default_rng(0)
+    numpy_kernels, numba_kernels = get_kernels("numpy"), get_kernels("numba")
+    for _ in range(20):
+        position, velocity, alive, faction = _random_state(rng)
+        enemy = faction[:, None] != faction[None, :]
+        same_faction = ~enemy
+        np.fill_diagonal(same_faction, False)
+
+        a = numpy_kernels.nearest_enemy(position, alive, enemy)
+        b = numba_kernels.nearest_enemy(position, alive, enemy)
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+        _, diff, dist = a
+
+        blocked = rng.random(alive.shape) < 0.3
+        v1, v2 = velocity.copy(), velocity.copy()
+        numpy_kernels.collide(v1, alive, alive, same_faction, blocked, diff, dist, 0.2)
+        numba_kernels.collide(v2, alive, alive, same_faction, blocked, diff, dist, 0.2)
+        np.testing.assert_array_equal(v1, v2)
+
+        # 死亡单位也放在地图外面，两边都要限制到地图内
+        move_speed = rng.uniform(0.5, 2.0, size=alive.shape)
+        slow = rng.random(alive.shape) < 0.5
+        p1, p2 = position.copy(), position.copy()
+        numpy_kernels.do_move(p1, v1, alive, slow, move_speed, 1 / 30, 0.6, np.array([13, 9]))
+        numba_kernels.do_move(p2, v2, alive, slow, move_speed, 1 / 30, 0.6, np.array([13, 9]))
+        np.testing.assert_array_equal(p1, p2)
+        np.testing.assert_array_equal(v1, v2)
+
+
+def test_batch_battles_match_across_backends():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scenes = [s for s in simulate.process_battle_data(CSV_PATH)
+              if BatchBattlefield.supports(s["left"], s["right"], monster_data)][:3]
+    assert scenes
+    for i, scene in enumerate(scenes):
+        results = {}
+        for name in ("numpy", "numba"):
+            batch = BatchBattlefield(monster_data, 8, seed=i, backend=name)
+            assert batch.setup_battle(scene["left"], scene["right"])
+            batch.run_battle()
+            results[name] = batch
+        np.testing.assert_array_equal(results["numpy"].winners, results["numba"].winners)
+        np.testing.assert_array_equal(results["numpy"].end_rounds, results["numba"].end_rounds)
@@ -0,0 +1,27 @@
+"""召唤物对象池：复用的怪物重置后，与新建的怪物跑出完全相同的对局"""
+from .. import simulate, utils
+from ..battle_field import Battlefield
+from ..monsters import MonsterFactory
+
+
+def _run(monster_data, scene, seed):
+    battlefield = Battlefield(monster_data, seed=seed)
+    assert battlefield.setup_battle(scene["left"], scene["right"], monster_data)
+    winner = battlefield.run_battle()
+    result = (winner, battlefield.round, battlefield.globalId,
+              sorted((m.id, m.name, m.health) for m in battlefield.alive_monsters if m.is_alive))
+    summons = list(battlefield.summons)
+    battlefield.release_summons()
+    return result, summons
+
+
+def test_pooled_summons_reproduce_battle():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scene = {"left": {"大喷蛛": 3}, "right": {"狗pro": 4}}
+    MonsterFactory._summon_pool.clear()
+    first, summons = _run(monster_data, scene, 0)
+    assert summons
+    second, reused = _run(monster_data, scene, 0)
+    assert second == first
+    assert {id(m) for m in reused} & {id(m) for m in summons}
@@ -0,0 +1,56 @@
+"""快照恢复和分叉：同样的随机状态必须得到与原战斗逐位相同的后续"""
+from .. import simulate, utils
+from ..battle_field import Battlefield
+from ..recorder import FrameRecorder
+
+SCENE = {"left": {"大喷蛛": 2, "阿咬": 3}, "right": {"狗pro": 4}}
+SNAPSHOT_ROUND = 250
+
+
+def _start(monster_data, seed=0):
+    battlefield = Battlefield(monster_data, seed=seed)
+    assert battlefield.setup_battle(SCENE["left"], SCENE["right"], monster_data)
+    for _ in range(SNAPSHOT_ROUND):
+        assert battlefield.run_one_frame() is None
+    # 快照时已经接敌，状态里有伤害、buff 和召唤物
+    assert any(m.health < m.max_health for m in battlefield.alive_monsters)
+    return battlefield
+
+
+def _finish(battlefield):
+    winner = battlefield.run_battle()
+    return (winner, battlefield.round, battlefield.globalId,
+            sorted((m.id, m.name, m.health) for m in battlefield.alive_monsters if m.is_alive))
+
+
+def test_restore_reproduces_original_run():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    battlefield = _start(monster_data)
+    snapshot = battlefield.snapshot()
+    original = _finish(battlefield)
+
+    # 同一个快照恢复两次，恢复到原战场和新战场都一样
+    battlefield.restore(snapshot)
+    assert battlefield.round == SNAPSHOT_ROUND
+    assert _finish(battlefield) == original
+    other = Battlefield(monster_data)
+    other.restore(snapshot)
+    assert _finish(other) == original
+
+
+def test_fork_is_independent_and_seeded():
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    reference = _finish(_start(monster_data))
+
+    battlefield = _start(monster_data)
+    recorder = FrameRecorder(capacity=16)
+    battlefield.recorder = recorder
+    a, b = battlefield.fork(seed=7), battlefield.fork(seed=7)
+    assert a.recorder is None and a.accelerator is None
+    assert _finish(a) == _finish(b)
+    # 分叉不影响原战场的后续，记录器也只属于原战场
+    count = recorder.count
+    assert _finish(battlefield) == reference
+    assert recorder.count > count
@@ -0,0 +1,81 @@
+"""
+时间步长与精度的取舍
+
+用不同的帧率（Battlefield 的 time_step）跑同一批对局，和 30 帧的结果以及数据集的标签比较，
+同时统计每秒能跑多少场，用来挑选筛选阶段可以使用的低帧率。
+
+用法（在包的上一级目录）：
+    python -m arknight.timestep arknight/arknights53.csv --limit 50 --fps 10 15 30 60
+"""
+import argparse
+import sys
+import time
+
+from .battle_field import Battlefield
+from .utils import VIRTUAL_TIME_STEP, Faction
+
+DEFAULT_FPS = (10, 15, 30, 60)
+
+
+def run_sample(monster_data, scenes, time_step, seeds=1):
+    """返回 (每场的胜者, 总帧数, 耗时)"""
+    winners = []
+    frames = 0
+    start = time.perf_counter()
+    for i, scene in enumerate(scenes):
+        for s in range(seeds):
+            battlefield = Battlefield(monster_data, seed=i * seeds + s, time_step=time_step)
+            if not battlefield.setup_battle(scene["left"], scene["right"], monster_data):
+                winners.append(None)
+                continue
+            winners.append(battlefield.run_battle())
+            frames += battlefield.round
+            battlefield.release_summons()
+    return winners, frames, time.perf_counter() - start
+
+
+def compare(monster_data, scenes, fps=DEFAULT_FPS, seeds=1, reference=VIRTUAL_TIME_STEP):
+    """每个帧率与 reference 帧率的胜负一致率、与标签的一致率以及吞吐量"""
+    labels = [scene.get("result") for scene in scenes for _ in range(seeds)]
+    results = {step: run_sample(monster_data, scenes, step, seeds) for step in sorted(set(fps) | {reference})}
+    base = results[reference][0]
+    rows = []
+    for step in fps:
+        winners, frames, elapsed = results[step]
+        valid = [i for i, w in enumerate(winners) if w is not None and base[i] is not None]
+        labelled = [i for i in valid if labels[i] in ("left", "right")]
+        rows.append({
+            "fps": step,
+            "battles": len(valid),
+            "agreement": sum(winners[i] == base[i] for i in valid) / max(len(valid), 1),
+            "label_accuracy": sum((winners[i] == Faction.LEFT) == (labels[i] == "left") for i in labelled) / max(len(labelled), 1),
+            "frames": frames,
+            "seconds": elapsed,
+            "battles_per_second": len(valid) / elapsed if elapsed > 0 else 0.0,
+            "speedup": results[reference][2] / elapsed if elapsed > 0 else 0.0,
+        })
+    return rows
+
+
+def main(argv=None):
+    from . import simulate, utils
+
+    parser = argparse.ArgumentParser(description="比较不同帧率下的胜负一致率和吞吐量")
+    parser.add_argument("csv", help="对局数据集")
+    parser.add_argument("--limit", type=int, default=50, help="只使用前多少个对局")
+    parser.add_argument("--seeds", type=int, default=1, help="每个对局使用的种子数")
+    parser.add_argument("--fps", type=int, nargs="+", default=list(DEFAULT_FPS))
+    parser.add_argument("--reference", type=int, default=VIRTUAL_TIME_STEP, help="作为基准的帧率")
+    args = parser.parse_args(argv)
+
+    utils.VISUALIZATION_MODE = False
+    monster_data = simulate.load_monster_data()
+    scenes = simulate.process_battle_data(args.csv)[:args.limit]
+    print(f"{'帧率':>6} {'对局':>6} {'与基准一致':>10} {'与标签一致':>10} {'帧数':>10} {'耗时(s)':>9} {'场/秒':>8} {'加速':>6}")
+    for r in compare(monster_data, scenes, args.fps, args.seeds, args.reference):
+        print(f"{r['fps']:>6} {r['battles']:>6} {r['agreement']:>10.1%} {r['label_accuracy']:>10.1%} {r['frames']:>10} "
+              f"{r['seconds']:>9.1f} {r['battles_per_second']:>8.2f} {r['speedup']:>6.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
 
 
+import bisect
 from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import Enum
+import json
 import math
 
 import numpy as np
@@ -16,15 +19,35 @@ if TYPE_CHECKING:
     from .monsters import Monster
 
 VISUALIZATION_MODE = True
+# 不为 None 时 debug_print 把消息交给它，而不是直接打印
+_debug_sink = None
 
 def debug_print(msg):
     if VISUALIZATION_MODE:
-        print(msg)
+        if _debug_sink is None:
+            print(msg)
+        else:
+            _debug_sink(msg)
+
+@contextmanager
+def redirect_debug_print(sink):
+    """with 块内 debug_print 的输出交给 sink(msg)"""
+    global _debug_sink
+    previous, _debug_sink = _debug_sink, sink
+    try:
+        yield
+    finally:
+        _debug_sink = previous
 
 class Faction(Enum):
     LEFT = 0
     RIGHT = 1
 
+class Draw(Enum):
+    """没有分出胜负的结局"""
+    TIMEOUT = 0     # 超过最大游戏时间
+    STALEMATE = 1   # 长时间没有任何单位的生命值发生变化
+
 class DamageType(Enum):
     PHYSICAL = "物理"
     MAGIC = "法术"
@@ -54,6 +77,31 @@ def lerp(a, b, x):
     return a + (b - a) * x
 
 
+def wilson_interval(wins, trials, z=1.96):
+    """胜率的 Wilson 置信区间"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = wins / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def normalize_army(army):
+    """支持 {名字: 数量} 和 scene.json 中 [{"name": 名字, "count": 数量}] 两种写法"""
+    if isinstance(army, dict):
+        return {name: int(count) for name, count in army.items() if count > 0}
+    return {entry["name"]: int(entry["count"]) for entry in army if entry["count"] > 0}
+
+
+def canonical_matchup(left_army, right_army):
+    """对局的规范化表示，同样的阵容总是得到同一个字符串"""
+    left = sorted((name, int(count)) for name, count in left_army.items() if count > 0)
+    right = sorted((name, int(count)) for name, count in right_army.items() if count > 0)
+    return json.dumps([left, right], ensure_ascii=False, separators=(',', ':'))
+
+
 @dataclass
 class BuffEffect:
     type: BuffType
@@ -65,6 +113,8 @@ class BuffEffect:
 
 VIRTUAL_TIME_STEP = 30 # 30帧相当于一秒
 VIRTUAL_TIME_DELTA = 1.0 / VIRTUAL_TIME_STEP
+# 每帧位移 = 速度 * 帧时长 * MOVE_SPEED_SCALE，为了和yj代码对齐乘以一个减速系数
+MOVE_SPEED_SCALE = 0.6
 
 def calculate_normal_dmg(defense, magic_resist, dmg, damageType: DamageType):
     """计算伤害值"""
@@ -133,6 +183,105 @@ class SpatialHash:
             self.insert(obj_id, pos)
 
 
+class LaneIndex:
+    """按行列分带的单位索引，用于十字/直线攻击查找各个方向上最近的敌人
+
+    每个 y 带内的单位按 x 排序，每个 x 带内的单位按 y 排序，查询时二分查找。
+    单位只在 do_move 中移动，所以每帧第一次查询时建一次索引即可；新单位加入时失效。
+    """
+    def __init__(self, battle_field : 'Battlefield', band_width=0.5):
+        self.band_width = band_width
+        self.battle_field = battle_field
+        self.valid = False
+        self.rows = {}     # (阵营, y 带) -> (按 x 排序的坐标, 单位)
+        self.columns = {}  # (阵营, x 带) -> (按 y 排序的坐标, 单位)
+
+    def invalidate(self):
+        self.valid = False
+
+    def _build(self):
+        rows = defaultdict(list)
+        columns = defaultdict(list)
+        band = self.band_width
+        for m in self.battle_field.monsters:
+            if not m.is_alive:
+                continue
+            x = m.position.x
+            y = m.position.y
+            rows[(m.faction, math.floor(y / band))].append((x, m.id, m))
+            columns[(m.faction, math.floor(x / band))].append((y, m.id, m))
+        self.rows = {key: self._sorted_lane(entries) for key, entries in rows.items()}
+        self.columns = {key: self._sorted_lane(entries) for key, entries in columns.items()}
+        self.valid = True
+
+    @staticmethod
+    def _sorted_lane(entries):
+        entries.sort(key=lambda e: (e[0], e[1]))
+        return [e[0] for e in entries], [e[2] for e in entries]
+
+    def _nearest(self, lanes, faction, cross, along, direction, half_width, cross_axis):
+        """在 |横向坐标 - cross| <= half_width 的带里，沿 direction 方向找纵向坐标离 along 最近的存活单位"""
+        band = self.band_width
+        best = None
+        best_dist = math.inf
+        for b in range(math.floor((cross - half_width) / band), math.floor((cross + half_width) / band) + 1):
+            lane = lanes.get((faction, b))
+            if lane is None:
+                continue
+            coords, units = lane
+            if direction > 0:
+                indices = range(bisect.bisect_right(coords, along), len(coords))
+            else:
+                indices = range(bisect.bisect_left(coords, along) - 1, -1, -1)
+            found_coord = None
+            for i in indices:
+                if found_coord is not None and coords[i] != found_coord:
+                    break
+                m = units[i]
+                if not m.is_alive or abs(getattr(m.position, cross_axis) - cross) > half_width:
+                    continue
+                # 距离相同时取 id 最小的，与按 monsters 顺序遍历的结果一致
+                dist = abs(coords[i] - along)
+                if dist < best_dist or (dist == best_dist and m.id < best.id):
+                    best = m
+                    best_dist = dist
+                found_coord = coords[i]
+        return best
+
+    def nearest_cardinal(self, faction, position : FastVector, half_width=0.5):
+        """faction 阵营在 position 上、下、左、右四个方向上最近的存活单位（没有时为 None）"""
+        if not self.valid:
+            self._build()
+        x = position.x
+        y = position.y
+        return (
+            self._nearest(self.columns, faction, x, y, 1, half_width, "x"),
+            self._nearest(self.columns, faction, x, y, -1, half_width, "x"),
+            self._nearest(self.rows, faction, y, x, -1, half_width, "y"),
+            self._nearest(self.rows, faction, y, x, 1, half_width, "y"),
+        )
+
+
+class ProximityTrigger:
+    """技能用的距离触发器，由 Battlefield 每帧统一判定一次
+
+    target_mode 为 None 时：有敌人进入 owner 半径 radius 内时触发，回调参数是这些敌人
+    （按 嘲讽降序 -> 距离升序 排列，与 TargetSelector 一致）；
+    target_mode 为 "enter"/"leave" 时：owner 的当前目标进入/离开半径时触发，回调参数是这个目标。
+    radius 为 None 时使用 owner 当前的攻击范围。
+    """
+    def __init__(self, owner : 'Monster', radius, callback, once=False, target_mode=None):
+        self.owner = owner
+        self.radius = radius
+        self.callback = callback
+        self.once = once
+        self.target_mode = target_mode
+        self.matches = None  # 本帧判定的结果，触发后清空
+
+    def get_radius(self):
+        return self.owner.attack_range if self.radius is None else self.radius
+
+
 # ID与怪物名称映射表 
 MONSTER_MAPPING = {
     0: "狗pro",
@@ -72,6 +72,48 @@ class FastVector:
         self.x += other.x
         self.y += other.y
         return self
+
+    def __isub__(self, other: 'FastVector') -> 'FastVector':
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    # 以下就地运算都不创建新对象，给每帧都要执行的移动代码使用
+    def set(self, x: float, y: float) -> 'FastVector':
+        self.x = x
+        self.y = y
+        return self
+
+    def set_diff(self, a: 'FastVector', b: 'FastVector') -> 'FastVector':
+        """self = a - b"""
+        self.x = a.x - b.x
+        self.y = a.y - b.y
+        return self
+
+    def scale(self, s: float) -> 'FastVector':
+        self.x *= s
+        self.y *= s
+        return self
+
+    def add_scaled(self, other: 'FastVector', s: float) -> 'FastVector':
+        """self += other * s"""
+        self.x += other.x * s
+        self.y += other.y * s
+        return self
+
+    def lerp(self, other: 'FastVector', t: float) -> 'FastVector':
+        """self = self * (1 - t) + other * t"""
+        self.x = self.x * (1 - t) + other.x * t
+        self.y = self.y * (1 - t) + other.y * t
+        return self
+
+    def clamp_length(self, max_length: float) -> 'FastVector':
+        """模长超过 max_length 时缩放到 max_length"""
+        d = math.sqrt(self.x**2 + self.y**2)
+        if d > max_length:
+            self.x = self.x / d * max_length
+            self.y = self.y / d * max_length
+        return self
     
     @property
     def magnitude_sq(self) -> float:
@@ -5,7 +5,7 @@ import time
 
 import numpy as np
 
-from .utils import VIRTUAL_TIME_DELTA, BuffEffect, BuffType
+from .utils import BuffEffect, BuffType
 
 class ZoneType:
     POISON = 0  #毒圈
@@ -54,7 +54,7 @@ class PoisonZone(EffectZone):
         # 添加或更新持续伤害效果
         target.status_system.apply(BuffEffect(
             type=BuffType.POWER_STONE,
-            duration=VIRTUAL_TIME_DELTA * 2,
+            duration=self.battle_field.delta_time * 2,
             source=self
         ))
 
@@ -86,7 +86,7 @@ class WineZone(EffectZone):
         # 添加或更新持续伤害效果
         target.status_system.apply(BuffEffect(
             type=BuffType.WINE,
-            duration=VIRTUAL_TIME_DELTA * 2,
+            duration=self.battle_field.delta_time * 2,
             source=self
         ))
 